@@ -0,0 +1,163 @@
+# analyze.py
+# 歷史 session 分析：彙整 sessions/ 下的所有紀錄，看哪張地圖最值得練
+#
+# 用法：
+#   python analyze.py                 # 分析 sessions/ 全部紀錄
+#   python analyze.py --map 妖精森林   # 只看某張地圖
+#   python analyze.py --top 10        # 列出前 10 名的 session
+#
+# 所有計算都是對 memmap 樣本陣列做向量化 NumPy 運算，不逐筆跑 Python 迴圈
+#
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from session_log import KIND_EXP, KIND_MESO, SESSIONS_DIR, list_sessions, load_session
+
+WINDOW = 600        # 滑動窗長度：10分鐘
+MAX_GAP = 120       # 兩筆經驗樣本相隔超過這麼多秒，該段不計入練功時間
+MESO_MAX_GAP = 600  # 金幣讀取間隔較長，另外設定
+
+
+def format_time(seconds) -> str:
+    """與 exp.format_time 相同；這裡不匯入 exp，以免離線分析也要載入 cv2 / pytesseract 與字模"""
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def rolling_gain(t, gained, window=WINDOW) -> np.ndarray:
+    """每個樣本往回 window 秒的經驗增量，換算成 每 window 秒 的速率（只取跨度足夠的點）"""
+    if len(t) < 2:
+        return np.zeros(0)
+    start = np.searchsorted(t, t - window, side="right") - 1
+    valid = start >= 0
+    idx = np.nonzero(valid)[0]
+    start = start[valid]
+    span = t[idx] - t[start]
+    ok = span > 0
+    return (gained[idx][ok] - gained[start][ok]) / span[ok] * window
+
+
+def interval_rates(t, gained, max_gap=MESO_MAX_GAP) -> np.ndarray:
+    """相鄰樣本之間的 每分鐘 增量（略過過長的空檔）"""
+    if len(t) < 2:
+        return np.zeros(0)
+    dt = np.diff(t)
+    dg = np.diff(gained)
+    ok = (dt > 0) & (dt <= max_gap)
+    return dg[ok] / dt[ok] * 60
+
+
+def hourly_breakdown(t, gained):
+    """依當地時間的小時彙總 (經驗增量, 練功分鐘數)"""
+    exp_by_hour = np.zeros(24)
+    minutes_by_hour = np.zeros(24)
+    if len(t) < 2:
+        return exp_by_hour, minutes_by_hour
+    dt = np.diff(t)
+    dg = np.diff(gained)
+    ok = (dt > 0) & (dt <= MAX_GAP)
+    hours = ((t[1:][ok] + time.localtime().tm_gmtoff) // 3600 % 24).astype(np.int64)
+    exp_by_hour += np.bincount(hours, weights=dg[ok], minlength=24)
+    minutes_by_hour += np.bincount(hours, weights=dt[ok] / 60, minlength=24)
+    return exp_by_hour, minutes_by_hour
+
+
+def analyze_session(meta, samples):
+    kind = samples["kind"]
+    exp = samples[kind == KIND_EXP]
+    meso = samples[kind == KIND_MESO]
+    t_exp = np.asarray(exp["t"], np.float64)
+    g_exp = np.asarray(exp["gained"], np.float64)
+    t_meso = np.asarray(meso["t"], np.float64)
+    g_meso = np.asarray(meso["gained"], np.float64)
+
+    duration = float(t_exp[-1] - t_exp[0]) if len(t_exp) > 1 else 0.0
+    total_exp = float(g_exp[-1] - g_exp[0]) if len(g_exp) > 1 else 0.0
+    rolling = rolling_gain(t_exp, g_exp)
+    return {
+        "id": meta.get("id", "?"),
+        "map": meta.get("map") or "未知",
+        "start": meta.get("start"),
+        "duration": duration,
+        "exp_per_10min": total_exp / duration * 600 if duration > 0 else 0.0,
+        "best_10min": float(rolling.max()) if len(rolling) else 0.0,
+        "rolling": rolling,
+        "meso_rates": interval_rates(t_meso, g_meso),
+        "hourly": hourly_breakdown(t_exp, g_exp),
+    }
+
+
+def percentiles(values):
+    if len(values) == 0:
+        return 0.0, 0.0, 0.0
+    p50, p90 = np.percentile(values, [50, 90])
+    return float(p50), float(p90), float(values.max())
+
+
+def print_report(results, top):
+    by_map = defaultdict(list)
+    for r in results:
+        by_map[r["map"]].append(r)
+
+    print("=== 各地圖分佈 ===")
+    print(f"{'地圖':<12}{'場數':>6}{'時數':>8}{'EXP/10分 p50':>16}{'p90':>12}{'max':>12}"
+          f"{'金幣/分 p50':>14}{'p90':>10}{'max':>10}")
+    for name, rs in sorted(by_map.items()):
+        rolling = np.concatenate([r["rolling"] for r in rs])
+        meso = np.concatenate([r["meso_rates"] for r in rs])
+        hours = sum(r["duration"] for r in rs) / 3600
+        e50, e90, emax = percentiles(rolling)
+        m50, m90, mmax = percentiles(meso)
+        print(f"{name:<12}{len(rs):>6}{hours:>8.1f}{e50:>16,.0f}{e90:>12,.0f}{emax:>12,.0f}"
+              f"{m50:>14,.0f}{m90:>10,.0f}{mmax:>10,.0f}")
+
+    print()
+    print(f"=== 最佳 {top} 場（依最佳滑動10分鐘經驗） ===")
+    for r in sorted(results, key=lambda r: r["best_10min"], reverse=True)[:top]:
+        start = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["start"])) if r["start"] else "?"
+        print(f"{r['id']:<24}{r['map']:<12}{start:<18}{format_time(r['duration']):>10}"
+              f"  最佳 {r['best_10min']:,.0f}  平均 {r['exp_per_10min']:,.0f} EXP/10分")
+
+    print()
+    print("=== 時段分析（平均 EXP/10分） ===")
+    exp_by_hour = np.sum([r["hourly"][0] for r in results], axis=0)
+    minutes_by_hour = np.sum([r["hourly"][1] for r in results], axis=0)
+    for hour in np.nonzero(minutes_by_hour)[0]:
+        rate = exp_by_hour[hour] / minutes_by_hour[hour] * 10
+        print(f"{hour:02d}:00  {minutes_by_hour[hour] / 60:>6.1f} 小時  {rate:>12,.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="彙整歷史 session 的經驗/金幣效率")
+    parser.add_argument("directory", nargs="?", default=SESSIONS_DIR, help="session 資料夾")
+    parser.add_argument("--map", help="只分析這張地圖")
+    parser.add_argument("--top", type=int, default=5, help="列出前幾名的 session")
+    parser.add_argument("--min-minutes", type=float, default=5, help="忽略短於此分鐘數的 session")
+    args = parser.parse_args(argv)
+
+    results = []
+    for path in list_sessions(args.directory):
+        try:
+            meta, samples = load_session(path)
+        except (OSError, ValueError) as e:
+            print(f"略過 {path}: {e}")
+            continue
+        if args.map and meta.get("map") != args.map:
+            continue
+        r = analyze_session(meta, samples)
+        if r["duration"] >= args.min_minutes * 60:
+            results.append(r)
+
+    if not results:
+        print("沒有可分析的 session")
+        return 1
+    print_report(results, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
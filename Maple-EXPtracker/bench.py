@@ -0,0 +1,285 @@
+# bench.py
+# 離線效能 / 準確度測試：把錄好的畫面重播過整條辨識流程，不需要開遊戲，可在無螢幕的 Linux 上跑
+#
+# 用法：
+#   python bench.py                     # 重播 bench/fixtures 下所有標註過的畫面
+#   python bench.py --cold              # 每張畫面都清掉錨點快取（量測整張搜尋）
+#   python bench.py --repeat 5          # 每張畫面重播 5 次，量測穩定的吞吐量
+#   python bench.py --record 20         # 在遊戲電腦上錄 20 張畫面到 bench/fixtures（之後手動確認標註）
+#   python bench.py --check-allocs      # 第一輪之後不應再配置新的共用緩衝，否則回傳 1（另外回報每張畫面的暫時配置量）
+#   python bench.py --synthesize        # 重新產生內附的合成畫面（assets 的模板以 0.75 / 1.0 / 1.5 倍貼上，數字已知）
+#
+# bench/fixtures/labels.json 格式：
+#   {"frames": [{"file": "2560x1440/0001.png", "exp": 440740, "percent": 13.21,
+#                "meso": 1234567, "login": [x, y] 或 null, "select": null}, ...]}
+#   沒有寫的欄位就不檢查
+#
+# 內附的 bench/fixtures 是合成畫面（不是遊戲截圖），數字用 OpenCV 字型畫上，
+# 字模 / Tesseract 讀這種字的準確度只供參考；速度與錨點、按鈕偵測的結果則與真實畫面相當
+#
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from calibration import calibration, resize_template
+from capture import ReplayCapture, get_capture, set_capture
+from detector import detector
+from exp import capture_exp_bar, exp_locator, ocr_gate, read_exp_and_percent
+from meso import wallet_reader
+from profiling import profiler
+import loging  # noqa: F401  註冊登入按鈕模板
+
+FIXTURES_DIR = os.path.join("bench", "fixtures")
+LABELS_FILE = "labels.json"
+POSITION_TOLERANCE = 5  # 按鈕位置誤差容許（像素）
+SYNTH_SCALES = (0.75, 1.0, 1.5)  # 合成畫面的 UI 縮放（畫面為 1920x1080 / 2560x1440 / 3840x2160）
+
+
+def load_labels(directory):
+    path = os.path.join(directory, LABELS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("frames", [])
+
+
+def _position_ok(found, expected):
+    if expected is None:
+        return found is None
+    return found is not None and abs(found.x - expected[0]) <= POSITION_TOLERANCE \
+        and abs(found.y - expected[1]) <= POSITION_TOLERANCE
+
+
+def _timed(func):
+    start = time.perf_counter()
+    try:
+        value = func()
+    except Exception as e:  # Tesseract 不存在等情況，算辨識失敗
+        print("  錯誤:", e)
+        value = None
+    return value, (time.perf_counter() - start) * 1000
+
+
+def run(directory, frames, cold=False, repeat=1, check_allocs=False):
+    files = [os.path.join(directory, f["file"]) for f in frames] * repeat
+    set_capture(ReplayCapture(files))
+    source = get_capture()
+
+    latencies = {"exp": [], "meso": [], "login": [], "frame": []}
+    correct = {"exp": 0, "meso": 0, "login": 0}
+    checked = {"exp": 0, "meso": 0, "login": 0}
+    allocs = {"warm": None, "steady": 0, "frame_kb": []}
+    # 錄製畫面的縮放與這台電腦無關：不讀也不寫 calibration.json，每種尺寸第一次出現時校正（不計時）
+    calibration.entries = {}
+    calibration.path = None
+    if check_allocs:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    for i in range(len(files)):
+        label = frames[i % len(frames)]
+        if i > 0 and not source.next_frame():
+            break
+        if i == len(frames):  # 第一輪跑完，之後都是穩定狀態
+            allocs["warm"] = profiler.counters.get("buffer_alloc", 0)
+        frame = source.grab()
+        if frame is None:
+            print("無法讀取", files[i])
+            continue
+        size = (frame.shape[1], frame.shape[0])
+        if calibration.get(size) is None:
+            calibration.calibrate(frame, exp_locator.template_path, size)
+        ocr_gate.reset()  # 每張都真的跑 OCR
+        wallet_reader.validator.reset()  # 各張畫面彼此無關，不做趨勢檢查
+        if cold:
+            exp_locator.invalidate()
+            wallet_reader.locator.invalidate()
+
+        if check_allocs:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        frame_start = time.perf_counter()
+        exp_reading, ms = _timed(lambda: read_exp_and_percent(capture_exp_bar()))
+        latencies["exp"].append(ms)
+        meso, ms = _timed(wallet_reader.read_on_screen)
+        latencies["meso"].append(ms)
+        found, ms = _timed(lambda: detector.detect(frame, group="login", full_frame=True))
+        latencies["login"].append(ms)
+        latencies["frame"].append((time.perf_counter() - frame_start) * 1000)
+        if check_allocs:
+            _, peak = tracemalloc.get_traced_memory()
+            allocs["frame_kb"].append((peak - base) / 1024)
+
+        if "exp" in label:
+            checked["exp"] += 1
+            correct["exp"] += exp_reading == (label["exp"], label.get("percent"))
+        if "meso" in label:
+            checked["meso"] += 1
+            correct["meso"] += meso == label["meso"]
+        if "login" in label or "select" in label:
+            found = found or {}
+            checked["login"] += 1
+            correct["login"] += all(
+                _position_ok(found.get(name), label[name]) for name in ("login", "select") if name in label
+            )
+
+    elapsed = time.perf_counter() - start
+    if check_allocs:
+        tracemalloc.stop()
+        if allocs["warm"] is not None:
+            allocs["steady"] = profiler.counters.get("buffer_alloc", 0) - allocs["warm"]
+    return latencies, correct, checked, elapsed, allocs
+
+
+def check_allocations(allocs) -> bool:
+    """穩定狀態（第一輪之後）不應再配置新的共用緩衝"""
+    kb = np.asarray(allocs["frame_kb"])
+    if len(kb):
+        print(f"每張畫面暫時配置 p50 {np.percentile(kb, 50):.1f} KB，最多 {kb.max():.1f} KB")
+    if allocs["warm"] is None:
+        print("⚠️ 至少要跑兩輪（--repeat 2）才能檢查穩定狀態")
+        return False
+    print(f"共用緩衝：第一輪配置 {allocs['warm']} 個，之後 {allocs['steady']} 個")
+    return allocs["steady"] == 0
+
+
+def print_report(latencies, correct, checked, elapsed):
+    n = len(latencies["frame"])
+    print(f"畫面數 {n}，總耗時 {elapsed:.2f}s，吞吐量 {n / elapsed if elapsed else 0:.1f} 張/秒")
+    print(f"{'項目':<8}{'p50 ms':>10}{'p99 ms':>10}{'準確度':>14}")
+    for name in ("exp", "meso", "login", "frame"):
+        values = np.asarray(latencies[name])
+        if len(values) == 0:
+            continue
+        p50, p99 = np.percentile(values, [50, 99])
+        acc = ""
+        if name in checked and checked[name]:
+            acc = f"{correct[name]}/{checked[name]} ({correct[name] / checked[name]:.1%})"
+        print(f"{name:<8}{p50:>10.2f}{p99:>10.2f}{acc:>14}")
+    print()
+    print("各階段：", profiler.overlay_line())
+    print("錨點快取：", exp_locator.stats())
+
+
+def _paste(frame, path, scale, x, y):
+    template = resize_template(cv2.imread(path, cv2.IMREAD_COLOR), scale)
+    h, w = template.shape[:2]
+    frame[y:y + h, x:x + w] = template
+    return w, h
+
+
+def _text(frame, text, x, y, scale, color):
+    """在 (x, y) 為左下角畫一行數字"""
+    cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.8 * scale, color,
+                max(1, round(2 * scale)), cv2.LINE_AA)
+
+
+def synthesize(directory):
+    """
+    產生合成畫面與標註：每個縮放各一張遊戲中（經驗條 + 開著的背包）、登入、選角畫面。
+    經驗數字為暗底亮字、金幣為亮底暗字，位置依 exp_bar_region / wallet_digits_region 的偏移
+    """
+    frames = []
+    for i, s in enumerate(SYNTH_SCALES):
+        width, height = round(2560 * s), round(1440 * s)
+        sub = f"{width}x{height}"
+        os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+        hud = np.full((height, width, 3), 40, np.uint8)
+        exp, percent, meso = 440740 + 12345 * i, 13.21 + 21.5 * i, 1234567 * (i + 1)
+        x, y = round(40 * s), height - round(140 * s)
+        _, h = _paste(hud, "assets/EXP.png", s, x, y)
+        _text(hud, f"{exp}[{percent:.2f}%]", x + round(80 * s), y + h - round(6 * s), s, (235, 235, 235))
+        gx, gy = round(2000 * s), round(900 * s)
+        _, h = _paste(hud, "assets/GASH.png", s, gx, gy)
+        hud[gy:gy + h, gx - round(400 * s):gx - round(5 * s)] = 225
+        text = f"{meso:,}"
+        (tw, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.8 * s, max(1, round(2 * s)))
+        _text(hud, text, gx - round(15 * s) - tw, gy + h - round(14 * s), s, (30, 30, 30))
+        frames.append({"file": f"{sub}/hud.png", "exp": exp, "percent": round(percent, 2), "meso": meso,
+                       "login": None, "select": None})
+
+        for name in ("login", "select"):
+            screen = np.full((height, width, 3), 90, np.uint8)
+            w = round(cv2.imread(f"assets/{name}.png").shape[1] * s)
+            x, y = (width - w) // 2, round((800 if name == "login" else 700) * s)
+            _paste(screen, f"assets/{name}.png", s, x, y)
+            label = {"file": f"{sub}/{name}.png", "login": None, "select": None}
+            label[name] = [x, y]
+            frames.append(label)
+            cv2.imwrite(os.path.join(directory, label["file"]), screen)
+        cv2.imwrite(os.path.join(directory, sub, "hud.png"), hud)
+
+    with open(os.path.join(directory, LABELS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"frames": frames}, f, ensure_ascii=False, indent=2)
+    print(f"已產生 {len(frames)} 張合成畫面到 {directory}")
+
+
+def record(directory, count, interval):
+    """在遊戲電腦上錄製畫面，並以目前的辨識結果當作待確認的標註"""
+    frames = load_labels(directory)
+    source = get_capture()
+    for i in range(count):
+        frame = source.grab()
+        if frame is None:
+            continue
+        sub = f"{frame.shape[1]}x{frame.shape[0]}"
+        os.makedirs(os.path.join(directory, sub), exist_ok=True)
+        name = f"{sub}/{time.strftime('%Y%m%d-%H%M%S')}-{i:03d}.png"
+        cv2.imwrite(os.path.join(directory, name), frame)
+
+        exp, percent = read_exp_and_percent(capture_exp_bar())
+        label = {"file": name, "verified": False}
+        if exp is not None:
+            label.update(exp=exp, percent=percent)
+        meso = wallet_reader.read_on_screen()
+        if meso is not None:
+            label["meso"] = meso
+        frames.append(label)
+        print(f"已錄製 {name}  {label}")
+        time.sleep(interval)
+
+    with open(os.path.join(directory, LABELS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"frames": frames}, f, ensure_ascii=False, indent=2)
+    print("請手動確認 labels.json 中 verified=false 的標註")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="重播錄製畫面，量測辨識流程的速度與準確度")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="畫面與標註所在資料夾")
+    parser.add_argument("--cold", action="store_true", help="每張畫面都清除錨點快取")
+    parser.add_argument("--repeat", type=int, default=1, help="每張畫面重播幾次")
+    parser.add_argument("--record", type=int, metavar="N", help="錄製 N 張畫面（需在遊戲電腦上執行）")
+    parser.add_argument("--interval", type=float, default=2.0, help="錄製間隔（秒）")
+    parser.add_argument("--synthesize", action="store_true", help="重新產生合成畫面與標註")
+    parser.add_argument("--check-allocs", action="store_true", help="檢查穩定狀態下不再配置新緩衝（至少重播兩輪）")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(args.fixtures, args.record, args.interval)
+        return 0
+    if args.synthesize:
+        synthesize(args.fixtures)
+        return 0
+
+    frames = load_labels(args.fixtures)
+    if not frames:
+        print(f"{args.fixtures} 中沒有標註畫面，請先用 --record 錄製")
+        return 1
+    repeat = max(args.repeat, 2) if args.check_allocs else args.repeat
+    result = run(args.fixtures, frames, cold=args.cold, repeat=repeat, check_allocs=args.check_allocs)
+    print_report(*result[:-1])
+    if args.check_allocs and not check_allocations(result[-1]):
+        print("❌ 穩定狀態仍在配置新緩衝")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
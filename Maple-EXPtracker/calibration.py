@@ -0,0 +1,134 @@
+# calibration.py
+# 解析度校正：模板是在 2560x1440 下截的，其他解析度 / UI 縮放 / 視窗模式需要先找出縮放比例
+#
+# - 第一次在某個畫面尺寸下執行時，用多種縮放比例（先粗後細）比對 EXP.png，找出最佳比例
+# - 結果存進 calibration.json，之後同尺寸直接讀取，不再重新搜尋
+# - 所有 ROI（經驗數字、金幣數字）都依這個比例換算
+#
+
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from capture import to_gray
+from templates import get_template
+
+CALIBRATION_PATH = "calibration.json"
+COARSE_SCALES = np.round(np.arange(0.5, 2.01, 0.1), 2)
+FINE_STEP = 0.01
+COARSE_DOWNSAMPLE = 0.5  # 粗找時把畫面縮小，減少比對量
+MIN_SCORE = 0.7
+
+
+def resize_template(template, scale):
+    if scale == 1.0:
+        return template
+    interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(template, None, fx=scale, fy=scale, interpolation=interp)
+
+
+def _match_at_scale(screen_gray, template_gray, scale):
+    t = resize_template(template_gray, scale)
+    if t.shape[0] < 4 or t.shape[1] < 4:
+        return -1.0, None
+    if t.shape[0] > screen_gray.shape[0] or t.shape[1] > screen_gray.shape[1]:
+        return -1.0, None
+    result = cv2.matchTemplate(screen_gray, t, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+
+def search_scale(screen_gray, template_gray, scales=COARSE_SCALES, fine_step=FINE_STEP):
+    """在縮放金字塔中找最佳比例，回傳 (scale, score, loc)"""
+    small = cv2.resize(screen_gray, None, fx=COARSE_DOWNSAMPLE, fy=COARSE_DOWNSAMPLE, interpolation=cv2.INTER_AREA)
+    coarse, coarse_score = 1.0, -1.0
+    for s in scales:
+        score, _ = _match_at_scale(small, template_gray, float(s) * COARSE_DOWNSAMPLE)
+        if score > coarse_score:
+            coarse, coarse_score = float(s), score
+
+    # 在最佳粗略比例附近以原解析度細找
+    best = (coarse, -1.0, None)
+    for s in np.arange(coarse - 0.05, coarse + 0.051, fine_step):
+        s = round(float(s), 3)
+        if s <= 0:
+            continue
+        score, loc = _match_at_scale(screen_gray, template_gray, s)
+        if score > best[1]:
+            best = (s, score, loc)
+    return best
+
+
+class ScaleCalibration:
+    """依畫面尺寸（例如 2560x1440）記住 UI 縮放比例，並存檔"""
+
+    def __init__(self, path=CALIBRATION_PATH):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._scaled = {}   # (模板路徑, mtime, scale, 灰階) -> 縮放後的模板
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print("校正檔讀取失敗:", e)
+
+    @staticmethod
+    def key(size) -> str:
+        return f"{size[0]}x{size[1]}"
+
+    def get(self, size) -> float | None:
+        entry = self.entries.get(self.key(size))
+        return entry["scale"] if entry else None
+
+    def calibrate(self, screen, template_path, size) -> float | None:
+        """在這張畫面上搜尋縮放比例；找到就存檔並回傳比例"""
+        entry = get_template(template_path)
+        if screen is None or entry is None:
+            return None
+        screen_gray = to_gray(screen, "calibration")
+        scale, score, _ = search_scale(screen_gray, entry.gray)
+        if score < MIN_SCORE:
+            return None
+        with self._lock:
+            self.entries[self.key(size)] = {"scale": scale, "score": round(float(score), 4)}
+            self._save()
+        print(f"📐 解析度 {self.key(size)} 校正完成：縮放 {scale:.2f}（相似度 {score:.2f}）")
+        return scale
+
+    def invalidate(self, size):
+        with self._lock:
+            if self.entries.pop(self.key(size), None) is not None:
+                self._save()
+
+    def scaled_template(self, template_path, scale, gray=False):
+        """取得縮放後的模板（彩色或灰階，依檔案 mtime 與比例快取）"""
+        entry = get_template(template_path)
+        if entry is None:
+            return None
+        cache_key = (template_path, entry.mtime, round(scale, 3), gray)
+        template = self._scaled.get(cache_key)
+        if template is None:
+            template = resize_template(entry.gray if gray else entry.color, scale)
+            self._scaled[cache_key] = template
+        return template
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+calibration = ScaleCalibration()
+
+
+def scaled(value, scale) -> int:
+    """把 2560x1440 下量到的像素距離換算成目前比例"""
+    return int(round(value * scale))
@@ -0,0 +1,246 @@
+# capture.py
+# 統一的截圖來源：所有子系統（經驗、錢包、登入）都透過 CaptureSource 取得 BGR 影像
+#
+# - MssCapture：即時螢幕擷取，每個執行緒重複使用同一個 mss 物件與輸出緩衝
+#   grab_gray() 直接把 BGRA 一次轉成灰階寫進重複使用的緩衝，不經過 BGR
+# - ReplayCapture：從硬碟讀取錄好的畫面（圖片資料夾或影片），可在無遊戲的 Linux 上測試
+#
+# region 一律為 (left, top, width, height)，座標相對於擷取來源的左上角
+# grab() / grab_gray() 回傳的陣列可能是共用緩衝或原畫面的 view：下次同用途的 grab 會覆寫，要保留請自行 copy()
+#
+
+import glob
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+from profiling import profiler
+
+
+class BufferPool:
+    """
+    依 (用途, 形狀) 重複使用的輸出緩衝，給 cv2 的 dst= 參數用。
+    每個執行緒各一份；真的配置新陣列時計入 profiler 的 buffer_alloc，穩定運作後應該不再增加
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, tag, shape, dtype=np.uint8) -> np.ndarray:
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        key = (tag, shape)
+        buf = buffers.get(key)
+        if buf is None or buf.dtype != dtype:
+            buf = buffers[key] = np.empty(shape, dtype)
+            profiler.count("buffer_alloc")
+        return buf
+
+
+buffers = BufferPool()
+
+
+def to_gray(img, tag) -> np.ndarray | None:
+    """BGR / BGRA 影像轉灰階，寫進 tag 用途的共用緩衝；已經是灰階就直接回傳"""
+    if img is None or img.ndim == 2:
+        return img
+    code = cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(img, code, dst=buffers.get(tag, img.shape[:2]))
+
+
+class CaptureSource(ABC):
+    """截圖來源介面，grab() 回傳 BGR 的 numpy 影像；沒實作 size() / grab() 的來源在建立時就會出錯"""
+
+    @abstractmethod
+    def size(self) -> tuple[int, int]:
+        """回傳整個畫面的 (width, height)"""
+
+    @abstractmethod
+    def grab(self, region=None) -> np.ndarray | None:
+        """擷取整個畫面或 region 區塊"""
+
+    def grab_gray(self, region=None, tag="gray") -> np.ndarray | None:
+        """擷取灰階影像，寫進 tag 用途的共用緩衝（同時要保留多塊時用不同的 tag）"""
+        return to_gray(self.grab(region), tag)
+
+    def next_frame(self) -> bool:
+        """前進到下一張畫面；即時來源永遠是最新畫面，直接回傳 True"""
+        return True
+
+    def close(self):
+        pass
+
+
+def clip_region(region, width, height):
+    """把 region 限制在畫面範圍內，完全超出時回傳 None"""
+    left, top, w, h = region
+    right = min(left + w, width)
+    bottom = min(top + h, height)
+    left = max(left, 0)
+    top = max(top, 0)
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right - left, bottom - top
+
+
+# ---------- 即時螢幕 ----------
+class MssCapture(CaptureSource):
+    def __init__(self, monitor_index=1):
+        self.monitor_index = monitor_index
+        self._local = threading.local()  # mss 物件不能跨執行緒共用
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def _monitor(self):
+        return self._sct().monitors[self.monitor_index]
+
+    def size(self):
+        mon = self._monitor()
+        return mon["width"], mon["height"]
+
+    def _grab_bgra(self, region):
+        """截取 region，回傳包住 mss 原始資料的 BGRA view（不複製）"""
+        sct = self._sct()
+        mon = self._monitor()
+        if region is None:
+            region = (0, 0, mon["width"], mon["height"])
+        region = clip_region(region, mon["width"], mon["height"])
+        if region is None:
+            return None
+        left, top, w, h = region
+        shot = sct.grab({"left": mon["left"] + left, "top": mon["top"] + top, "width": w, "height": h})
+        return np.frombuffer(shot.raw, np.uint8).reshape(shot.height, shot.width, 4)
+
+    def grab(self, region=None):
+        with profiler.stage("capture"):
+            bgra = self._grab_bgra(region)
+            if bgra is None:
+                return None
+            return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=buffers.get("bgr", bgra.shape[:2] + (3,)))
+
+    def grab_gray(self, region=None, tag="gray"):
+        with profiler.stage("capture"):
+            return to_gray(self._grab_bgra(region), tag)  # BGRA → 灰階一次完成
+
+    def close(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+# ---------- 錄製畫面重播 ----------
+class ReplayCapture(CaptureSource):
+    """
+    path 可以是：
+     - 資料夾：依檔名排序讀取其中的 .png / .jpg / .npy
+     - 檔案清單：依清單順序讀取
+     - 影片檔：用 cv2.VideoCapture 逐格讀取
+    每次 next_frame() 前進一張，loop=True 時播完從頭開始
+    """
+
+    IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".npy")
+
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self.frame = None
+        self.index = -1
+        self._video = None
+        self._files = []
+        if isinstance(path, (list, tuple)):
+            self._files = list(path)
+        elif os.path.isdir(path):
+            self._files = sorted(
+                f for f in glob.glob(os.path.join(path, "*")) if f.lower().endswith(self.IMAGE_EXTS)
+            )
+        else:
+            self._video = cv2.VideoCapture(path)
+        self.next_frame()
+
+    @staticmethod
+    def _read_file(path):
+        if path.lower().endswith(".npy"):
+            return np.load(path)
+        return cv2.imread(path, cv2.IMREAD_COLOR)
+
+    def next_frame(self):
+        with profiler.stage("capture"):
+            return self._next_frame()
+
+    def _next_frame(self):
+        if self._video is not None:
+            ok, frame = self._video.read()
+            if not ok and self.loop:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self._video.read()
+            if not ok:
+                self.frame = None
+                return False
+            self.index += 1
+            self.frame = frame
+            return True
+
+        if not self._files:
+            self.frame = None
+            return False
+        self.index += 1
+        if self.index >= len(self._files):
+            if not self.loop:
+                self.frame = None
+                return False
+            self.index = 0
+        self.frame = self._read_file(self._files[self.index])
+        return self.frame is not None
+
+    def size(self):
+        if self.frame is None:
+            return 0, 0
+        return self.frame.shape[1], self.frame.shape[0]
+
+    def grab(self, region=None):
+        if self.frame is None:
+            return None
+        if region is None:
+            return self.frame
+        region = clip_region(region, self.frame.shape[1], self.frame.shape[0])
+        if region is None:
+            return None
+        left, top, w, h = region
+        return self.frame[top:top + h, left:left + w]
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+
+# ---------- 全域預設來源 ----------
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_capture() -> CaptureSource:
+    """取得目前的截圖來源（預設為主螢幕的 MssCapture）"""
+    global _source
+    with _source_lock:
+        if _source is None:
+            _source = MssCapture()
+        return _source
+
+
+def set_capture(source: CaptureSource):
+    """替換全域截圖來源，例如改用 ReplayCapture 做測試或效能分析"""
+    global _source
+    with _source_lock:
+        _source = source
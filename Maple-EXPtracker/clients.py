@@ -0,0 +1,253 @@
+# clients.py
+# 多開：同一個程序同時追蹤並排的多個遊戲視窗
+#
+# - 每個 ClientContext 以畫面上的矩形（視窗位置或某個螢幕）區分，各自有錨點快取、樣本緩衝、速率與合理性檢查
+# - 每次 tick 只截一次整個畫面；錨點失效時也只做一次 detector.detect_many，
+#   再依落在哪個矩形把找到的經驗條 / 錢包分配給各個 client
+# - 各 client 的數字區域一起送進 OCR 池（沒有池時依序辨識），所以多一個 client 只多它自己的 OCR
+# - 錢包只做被動讀取（背包開著才讀），不會對某個視窗按鍵
+#
+
+import time
+from collections import deque
+
+import cv2
+
+from calibration import calibration
+from capture import clip_region, get_capture
+from detector import detector
+from exp import ExpTracker, exp_bar_region, exp_locator, ocr_confidence, read_region
+from meso import MesoTracker, wallet_digits_region, wallet_reader
+from ocr_pool import RESULT_TIMEOUT
+from pipeline import Sample
+from profiling import profiler
+from validation import ExpValidator, MesoValidator
+
+EXP_TARGET = exp_locator.name
+WALLET_TARGET = wallet_reader.locator.name
+WALLET_SEARCH_INTERVAL = 30.0  # 背包多半關著，整張找錢包最多每 30 秒一次
+ANCHOR_MARGIN = 16             # 小範圍確認錨點時往外擴的像素（2560x1440 下）
+
+
+def crop(frame, region):
+    """從共用的整張畫面切出 region（不複製）"""
+    region = clip_region(region, frame.shape[1], frame.shape[0])
+    if region is None:
+        return None
+    left, top, w, h = region
+    return frame[top:top + h, left:left + w]
+
+
+class ClientContext:
+    """一個遊戲視窗的追蹤狀態；rect 為 (left, top, width, height)，座標相對於截取的整張畫面"""
+
+    def __init__(self, name, rect, sample_buffer=512):
+        self.name = name
+        self.rect = rect
+        self.tracker = ExpTracker()
+        self.meso_tracker = MesoTracker()
+        self.meso_tracker.start()
+        self.exp_validator = ExpValidator()
+        self.meso_validator = MesoValidator()
+        self.samples = deque(maxlen=sample_buffer)  # 最近的 Sample
+        # 錨點快取（整張畫面座標）
+        self.exp_pos = None
+        self.wallet_pos = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, kind) -> str:
+        """OCR 快取鍵，各 client 分開"""
+        return f"{self.name}:{kind}"
+
+    def contains(self, x, y) -> bool:
+        if self.rect is None:
+            return True
+        left, top, w, h = self.rect
+        return left <= x < left + w and top <= y < top + h
+
+    def record(self, sample):
+        """把一筆已驗證的 Sample 記進 tracker 與緩衝"""
+        self.samples.append(sample)
+        if sample.exp is not None and sample.percent is not None:
+            with profiler.stage("tracker"):
+                self.tracker.update(sample.exp, sample.percent, now=sample.timestamp)
+        if sample.meso is not None:
+            self.meso_tracker.record(sample.meso, now=sample.timestamp)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "exp": self.exp_validator.stats(),
+            "meso": self.meso_validator.stats(),
+        }
+
+
+class MultiClientTracker:
+    def __init__(self, clients, ocr_pool=None, read_meso=True):
+        self.clients = list(clients)
+        self.ocr_pool = ocr_pool
+        self.read_meso = read_meso
+        self.scale = 1.0
+        self.full_searches = 0
+        self._last_wallet_search = 0.0
+        self._last_calibration = 0.0
+
+    # ---------- 錨點 ----------
+    def _update_scale(self, frame):
+        size = (frame.shape[1], frame.shape[0])
+        scale = calibration.get(size)
+        if scale is None and time.time() - self._last_calibration > 60:
+            self._last_calibration = time.time()
+            scale = calibration.calibrate(frame, exp_locator.template_path, size)
+        self.scale = scale if scale is not None else 1.0
+
+    def _confirm(self, frame, target, pos):
+        """在共用畫面上只比對 pos 附近的小區塊，回傳新位置或 None"""
+        template = calibration.scaled_template(detector.targets[target].path, self.scale)
+        if template is None:
+            return None
+        th, tw = template.shape[:2]
+        margin = round(ANCHOR_MARGIN * self.scale)
+        left, top = max(pos[0] - margin, 0), max(pos[1] - margin, 0)
+        window = crop(frame, (left, top, tw + 2 * margin, th + 2 * margin))
+        if window is None or window.shape[0] < th or window.shape[1] < tw:
+            return None
+        with profiler.stage("match"):
+            result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val < detector.targets[target].confidence:
+            return None
+        return left + max_loc[0], top + max_loc[1]
+
+    def _locate(self, frame, now):
+        """確認每個 client 的錨點；有 client 找不到時，所有 client 共用一次整張搜尋"""
+        need = set()
+        for c in self.clients:
+            if c.exp_pos is not None:
+                c.exp_pos = self._confirm(frame, EXP_TARGET, c.exp_pos)
+                if c.exp_pos is not None:
+                    c.hits += 1
+                else:
+                    c.misses += 1
+            if c.exp_pos is None:
+                need.add(EXP_TARGET)
+            if self.read_meso and c.wallet_pos is not None:
+                c.wallet_pos = self._confirm(frame, WALLET_TARGET, c.wallet_pos)
+            if self.read_meso and c.wallet_pos is None and now - self._last_wallet_search >= WALLET_SEARCH_INTERVAL:
+                need.add(WALLET_TARGET)
+        if not need:
+            return
+
+        self.full_searches += 1
+        if WALLET_TARGET in need:
+            self._last_wallet_search = now
+        found = detector.detect_many(frame, sorted(need), max_hits=len(self.clients))
+        for target, detections in found.items():
+            attr = "exp_pos" if target == EXP_TARGET else "wallet_pos"
+            for d in detections:
+                for c in self.clients:
+                    if getattr(c, attr) is None and c.contains(d.x, d.y):
+                        setattr(c, attr, (d.x, d.y))
+                        break
+
+    # ---------- OCR ----------
+    def _regions(self, frame):
+        """回傳 {快取鍵: (kind, 影像, 原始區域, client)}"""
+        regions = {}
+        for c in self.clients:
+            if c.exp_pos is not None:
+                region = exp_bar_region(c.exp_pos, self.scale)
+                regions[c.key("exp")] = ("exp", crop(frame, region), region, c)
+            if self.read_meso and c.wallet_pos is not None:
+                height = calibration.scaled_template(wallet_reader.locator.template_path, self.scale).shape[0]
+                region = wallet_digits_region(c.wallet_pos, self.scale, height)
+                regions[c.key("meso")] = ("meso", crop(frame, region), region, c)
+        return regions
+
+    def _recognize(self, regions) -> dict:
+        if self.ocr_pool is not None:
+            futures = self.ocr_pool.submit_batch({key: (kind, img) for key, (kind, img, _, _) in regions.items()})
+            results = {}
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result(timeout=RESULT_TIMEOUT)
+                    continue
+                except Exception as e:  # 逾時或工作行程出錯：這一塊改在本執行緒辨識
+                    print("OCR 池錯誤，改在本執行緒辨識:", type(e).__name__, e)
+                kind, img, _, _ = regions[key]
+                try:
+                    results[key] = read_region(kind, img, key=key)
+                except Exception as e:
+                    print("OCR 錯誤:", e)
+            return results
+        results = {}
+        for key, (kind, img, _, _) in regions.items():
+            try:
+                results[key] = read_region(kind, img, key=key)
+            except Exception as e:
+                print("OCR 錯誤:", e)
+        return results
+
+    @staticmethod
+    def _reread(kind, region, key):
+        """只重新截取那一小塊，用 Tesseract 再讀一次"""
+        value = read_region(kind, get_capture().grab_gray(region, tag=key), reread=True, key=key)
+        if kind == "exp" and value[0] is None:
+            return None
+        return value
+
+    # ---------- 每次取樣 ----------
+    def tick(self, now=None) -> list:
+        """截一次畫面、讀取所有 client，回傳 [(client, Sample), ...]；由呼叫端以 client.record() 記錄"""
+        now = time.time() if now is None else now
+        frame = get_capture().grab()
+        if frame is None:
+            return []
+        self._update_scale(frame)
+        self._locate(frame, now)
+        regions = self._regions(frame)
+        results = self._recognize(regions)
+
+        out = []
+        for c in self.clients:
+            exp = percent = meso = None
+            key = c.key("exp")
+            reading = results.get(key)
+            if reading is not None and reading[0] is not None:
+                region = regions[key][2]
+                reading = c.exp_validator.validate(
+                    reading, ocr_confidence.get(key), now,
+                    reread=lambda: self._reread("exp", region, key),
+                )
+                if reading is not None:
+                    exp, percent = reading
+            key = c.key("meso")
+            if results.get(key) is not None:
+                region = regions[key][2]
+                meso = c.meso_validator.validate(
+                    results[key], ocr_confidence.get(key), now,
+                    reread=lambda: self._reread("meso", region, key),
+                )
+            out.append((c, Sample(now, exp, percent, meso)))
+        return out
+
+
+# ---------- 建立 client ----------
+def parse_client(spec) -> ClientContext:
+    """'名稱=left,top,width,height' → ClientContext"""
+    name, _, rect = spec.partition("=")
+    left, top, w, h = (int(v) for v in rect.split(","))
+    return ClientContext(name, (left, top, w, h))
+
+
+def monitor_clients() -> list:
+    """每個螢幕一個 client，矩形相對於所有螢幕合成的虛擬桌面（mss 的 monitors[0]）"""
+    import mss
+    with mss.mss() as sct:
+        desktop = sct.monitors[0]
+        return [
+            ClientContext(f"monitor{i}", (m["left"] - desktop["left"], m["top"] - desktop["top"], m["width"], m["height"]))
+            for i, m in enumerate(sct.monitors[1:], start=1)
+        ]
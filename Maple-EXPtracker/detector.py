@@ -0,0 +1,213 @@
+# detector.py
+# 單張畫面多目標偵測：一次截圖，找出所有註冊的模板（經驗條、錢包、登入按鈕……）
+#
+# - 整張畫面只轉一次灰階，並建立共用的縮小金字塔做粗找
+# - 每個模板在粗找層取出幾個候選點，再回到原解析度只在候選點附近精修
+# - 結果發布給所有訂閱者，追蹤的 UI 元素變多時截圖與粗找成本不變
+#
+
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+from calibration import calibration
+from capture import buffers, to_gray
+from profiling import profiler
+
+Detection = namedtuple("Detection", ["name", "x", "y", "w", "h", "score"])
+
+
+class Target:
+    __slots__ = ("name", "path", "confidence", "roi", "group")
+
+    def __init__(self, name, path, confidence, roi, group):
+        self.name = name
+        self.path = path
+        self.confidence = confidence
+        self.roi = roi      # (left, top, width, height)，以畫面比例 0~1 表示；None 表示整張
+        self.group = group  # 同一組的模板一起偵測，例如遊戲中介面 "hud"、登入畫面 "login"
+
+
+def build_pyramid(gray, levels) -> list:
+    """gray 為第 0 層，之後每層長寬減半（各層寫進共用緩衝）"""
+    pyramid = [gray]
+    for level in range(1, levels + 1):
+        h, w = pyramid[-1].shape[:2]
+        dst = buffers.get(f"pyramid{level}", ((h + 1) // 2, (w + 1) // 2))
+        pyramid.append(cv2.pyrDown(pyramid[-1], dst=dst))
+    return pyramid
+
+
+def top_peaks(result, count, suppress) -> list:
+    """從比對結果取出前 count 個峰值，每取一個就把附近 suppress 範圍壓掉（非極大值抑制，會改寫 result）"""
+    peaks = []
+    for _ in range(count):
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val <= -1.0:
+            break
+        peaks.append((max_val, max_loc))
+        x, y = max_loc
+        sw, sh = suppress
+        result[max(y - sh, 0):y + sh + 1, max(x - sw, 0):x + sw + 1] = -1.0
+    return peaks
+
+
+def iou(a, b) -> float:
+    """兩個 Detection 框的交集 / 聯集"""
+    w = min(a.x + a.w, b.x + b.w) - max(a.x, b.x)
+    h = min(a.y + a.h, b.y + b.h) - max(a.y, b.y)
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / (a.w * a.h + b.w * b.h - inter)
+
+
+class MultiTargetDetector:
+    def __init__(self, levels=1, candidates=3, coarse_threshold=0.5):
+        self.levels = levels                    # 粗找層（每層縮小一半）
+        self.candidates = candidates            # 每個模板在粗找層保留的候選點數
+        self.coarse_threshold = coarse_threshold
+        self.targets = {}
+        self.results = {}
+        self.last_scores = {}                   # 每個模板最近一次的最高分（沒達門檻也記錄）
+        self.last_latency_ms = 0.0              # 最近一次偵測耗時
+        self.last_scale = 1.0                   # 最近一次偵測使用的縮放比例
+        self.subscribers = []
+        self._lock = threading.Lock()
+
+    def register(self, name, path, confidence=0.8, roi=None, group="hud"):
+        self.targets[name] = Target(name, path, confidence, roi, group)
+
+    def subscribe(self, callback):
+        """callback(results: dict[name, Detection | None])，每次 detect 後呼叫"""
+        self.subscribers.append(callback)
+
+    def _template(self, path, scale, level):
+        return calibration.scaled_template(path, scale * (0.5 ** level), gray=True)
+
+    @staticmethod
+    def _roi_pixels(roi, width, height):
+        if roi is None:
+            return 0, 0, width, height
+        left, top, w, h = roi
+        return int(left * width), int(top * height), int(w * width), int(h * height)
+
+    def _candidates(self, target, pyramid, scale, max_hits, full_frame=False):
+        """回傳精修後的候選 Detection（分數由高到低，已做非極大值抑制），以及最高分"""
+        full = pyramid[0]
+        height, width = full.shape[:2]
+        rl, rt, rw, rh = self._roi_pixels(None if full_frame else target.roi, width, height)
+        template = self._template(target.path, scale, 0)
+        if template is None:
+            return [], -1.0
+        th, tw = template.shape[:2]
+
+        # 粗找：在金字塔頂層的 ROI 內比對
+        level = self.levels
+        factor = 2 ** level
+        coarse_t = self._template(target.path, scale, level)
+        coarse = pyramid[level][rt // factor:(rt + rh) // factor, rl // factor:(rl + rw) // factor]
+        if coarse_t is None or coarse.shape[0] < coarse_t.shape[0] or coarse.shape[1] < coarse_t.shape[1]:
+            return [], -1.0
+        result = cv2.matchTemplate(coarse, coarse_t, cv2.TM_CCOEFF_NORMED)
+        count = max(self.candidates, max_hits)
+        peaks = top_peaks(result, count, (coarse_t.shape[1] // 2, coarse_t.shape[0] // 2))
+
+        # 精修：回到原解析度，只比對候選點附近
+        found = []
+        margin = factor + 2
+        for score, (cx, cy) in peaks:
+            if score < self.coarse_threshold:
+                break
+            x0 = max(rl + cx * factor - margin, 0)
+            y0 = max(rt + cy * factor - margin, 0)
+            window = full[y0:y0 + th + 2 * margin, x0:x0 + tw + 2 * margin]
+            if window.shape[0] < th or window.shape[1] < tw:
+                continue
+            res = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(res)
+            found.append(Detection(target.name, x0 + max_loc[0], y0 + max_loc[1], tw, th, float(max_val)))
+
+        found.sort(key=lambda d: d.score, reverse=True)
+        best_score = found[0].score if found else -1.0
+        kept = []
+        for d in found:
+            if d.score < target.confidence or len(kept) >= max_hits:
+                break
+            if all(iou(d, k) < 0.3 for k in kept):
+                kept.append(d)
+        return kept, best_score
+
+    def _begin(self, frame):
+        gray = to_gray(frame, "detect")  # 截圖時已是灰階就不必再轉
+        pyramid = build_pyramid(gray, self.levels)
+        scale = calibration.get((frame.shape[1], frame.shape[0])) or 1.0
+        return pyramid, scale
+
+    def detect(self, frame, group="hud", full_frame=False) -> dict:
+        """
+        在一張 BGR（或已轉好的灰階）畫面上找出同一組的所有模板（各取最佳一個），並通知訂閱者。
+        full_frame=True 時忽略各模板的 ROI，搜尋整張畫面
+        """
+        if frame is None:
+            return {}
+        start = time.perf_counter()
+        pyramid, scale = self._begin(frame)
+        self.last_scale = scale
+
+        results = {}
+        scores = {}
+        for name, target in list(self.targets.items()):
+            if target.group == group:
+                kept, scores[name] = self._candidates(target, pyramid, scale, 1, full_frame)
+                results[name] = kept[0] if kept else None
+
+        with self._lock:
+            self.results.update(results)
+            self.last_scores.update(scores)
+            self.last_latency_ms = (time.perf_counter() - start) * 1000
+        profiler.record("match", self.last_latency_ms)
+        for callback in self.subscribers:
+            callback(results)
+        return results
+
+    def detect_many(self, frame, names, max_hits=5) -> dict:
+        """
+        多開時使用：同一張畫面（只轉一次灰階、建一次金字塔）上，每個模板各找最多 max_hits 個
+        不重疊的 Detection，回傳 {name: [Detection, ...]}
+        """
+        if frame is None:
+            return {}
+        start = time.perf_counter()
+        pyramid, scale = self._begin(frame)
+        self.last_scale = scale
+        found = {}
+        scores = {}
+        for name in names:
+            target = self.targets.get(name)
+            if target is not None:
+                found[name], scores[name] = self._candidates(target, pyramid, scale, max_hits)
+        with self._lock:
+            self.last_scores.update(scores)
+            self.last_latency_ms = (time.perf_counter() - start) * 1000
+        profiler.record("match", self.last_latency_ms)
+        return found
+
+    def detect_all(self, frame, name, max_hits=5) -> list:
+        """同一個模板可能出現多次時使用：回傳最多 max_hits 個不重疊的 Detection"""
+        target = self.targets.get(name)
+        if frame is None or target is None:
+            return []
+        start = time.perf_counter()
+        pyramid, scale = self._begin(frame)
+        kept, best_score = self._candidates(target, pyramid, scale, max_hits)
+        with self._lock:
+            self.last_scores[name] = best_score
+            self.last_latency_ms = (time.perf_counter() - start) * 1000
+        profiler.record("match", self.last_latency_ms)
+        return kept
+
+
+detector = MultiTargetDetector()
@@ -0,0 +1,197 @@
+# digit_ocr.py
+# 遊戲固定點陣字型的數字辨識器（在程式內完成，不必每次開 Tesseract 子程序）
+#
+# 做法：
+# - 二值化後的字串圖依「欄投影」切成一個個字元
+# - 每個字元縮放成固定大小的向量，與已學會的字模（NumPy 陣列）做相關比對
+# - 字模由 Tesseract 成功辨識的結果自動學習，並存檔重複使用
+# - 信心不足時回傳 None，由呼叫端改用 Tesseract 備援
+#
+
+import os
+import threading
+
+import cv2
+import numpy as np
+
+CHARSET = "0123456789[].%,"
+GLYPH_H = 16
+GLYPH_W = 10
+MAX_SAMPLES_PER_CHAR = 3
+
+
+class DigitRecognizer:
+    """
+    以字模比對辨識只含 0123456789[].%, 的字串。
+    recognize() 回傳 (text, confidences)，confidences 為每個字元的比對分數
+    """
+
+    def __init__(self, path=None, min_confidence=0.85):
+        self.path = path
+        self.min_confidence = min_confidence
+        self.labels = []                                          # 每個字模對應的字元
+        self.templates = np.zeros((0, GLYPH_H * GLYPH_W), np.float32)
+        self.widths = np.zeros(0, np.int32)                      # 字模原始寬度
+        self.version = 0                                          # 每學到新字模加一（OCR 池據此同步給工作行程）
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()                        # 兩個執行緒同時存檔時不共用同一個暫存檔
+        if path and os.path.exists(path):
+            try:
+                self.load(path)
+            except Exception as e:  # 檔案損毀（例如存檔中斷）時從未訓練狀態開始，不影響啟動
+                print("字模檔讀取失敗，重新學習:", e)
+
+    # ---------- 存取 ----------
+    def load(self, path):
+        with np.load(path) as data:
+            templates = data["templates"].astype(np.float32)
+            widths = data["widths"].astype(np.int32)
+            labels = [str(c) for c in data["labels"]]
+        if len(templates) != len(labels) or len(widths) != len(labels):
+            raise ValueError("字模數量不一致")
+        self.templates, self.widths, self.labels = templates, widths, labels
+
+    def snapshot(self) -> tuple:
+        """(version, templates, widths, labels)；陣列學習時整個換新、不會就地修改，可以直接傳給其他行程"""
+        return self.version, self.templates, self.widths, tuple(self.labels)
+
+    def restore(self, snapshot):
+        """換成 snapshot() 的字模（OCR 工作行程用，不存檔）"""
+        self.version, self.templates, self.widths, labels = snapshot
+        self.labels = list(labels)
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:  # 取同一版的三個欄位，學習中途存檔也不會數量不一致
+            _, templates, widths, labels = self.snapshot()
+        with self._save_lock:
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:  # 傳檔案物件，np.savez 才不會自動加上 .npz
+                np.savez(f, templates=templates, widths=widths, labels=np.array(labels))
+            os.replace(tmp, path)
+
+    def _save_quietly(self):
+        """學習後存檔只為了下次啟動沿用；寫入失敗（磁碟滿、沒有權限）時只印出，已學到的字模與這次讀數照常使用"""
+        try:
+            self.save()
+        except Exception as e:
+            print("字模存檔失敗:", e)
+
+    def is_trained(self) -> bool:
+        return len(self.labels) > 0
+
+    # ---------- 切字 ----------
+    @staticmethod
+    def _foreground(binary) -> np.ndarray:
+        """前景取像素較少的那一色（白底黑字或黑底白字都可）"""
+        on = binary > 127
+        if np.count_nonzero(on) > on.size // 2:
+            on = ~on
+        return on
+
+    @staticmethod
+    def _text_band(fg):
+        """找出前景最多的那一段連續列，當作文字所在的行"""
+        rows = fg.any(axis=1)
+        best, best_len, start = None, 0, None
+        for i, r in enumerate(np.append(rows, False)):
+            if r and start is None:
+                start = i
+            elif not r and start is not None:
+                count = np.count_nonzero(fg[start:i])
+                if count > best_len:
+                    best, best_len = (start, i), count
+                start = None
+        return best
+
+    def segment(self, binary) -> list:
+        """回傳每個字元的 (left, right) 欄範圍，以及文字行的上下界"""
+        fg = self._foreground(binary)
+        band = self._text_band(fg)
+        if band is None:
+            return [], None
+        top, bottom = band
+        cols = np.append(fg[top:bottom].any(axis=0), False)
+
+        spans = []
+        start = None
+        for i, c in enumerate(cols):
+            if c and start is None:
+                start = i
+            elif not c and start is not None:
+                spans.append((start, i))
+                start = None
+        return spans, (top, bottom, fg)
+
+    @staticmethod
+    def _normalize(glyph) -> np.ndarray:
+        """縮放成固定大小並做零均值、單位長度，方便用內積當相關係數"""
+        g = cv2.resize(glyph.astype(np.float32), (GLYPH_W, GLYPH_H), interpolation=cv2.INTER_AREA).ravel()
+        g -= g.mean()
+        norm = np.linalg.norm(g)
+        if norm > 0:
+            g /= norm
+        return g
+
+    def _glyph_vectors(self, binary):
+        spans, band = self.segment(binary)
+        if not spans:
+            return None, None
+        top, bottom, fg = band
+        vecs = np.empty((len(spans), GLYPH_H * GLYPH_W), np.float32)
+        for k, (l, r) in enumerate(spans):
+            vecs[k] = self._normalize(fg[top:bottom, l:r])
+        widths = np.array([r - l for l, r in spans], np.int32)
+        return vecs, widths
+
+    # ---------- 辨識 ----------
+    def recognize(self, binary):
+        """
+        辨識二值化字串圖，回傳 (text, confidences)。
+        沒有字模或任一字元信心不足時回傳 (None, confidences)
+        """
+        if binary is None or not self.is_trained():
+            return None, np.zeros(0, np.float32)
+        vecs, widths = self._glyph_vectors(binary)
+        if vecs is None:
+            return None, np.zeros(0, np.float32)
+
+        scores = vecs @ self.templates.T                               # (字元數, 字模數)
+        # 寬度差太多的字模打折（例如 '.' 與 '1' 縮放後可能很像）
+        width_gap = np.abs(widths[:, None] - self.widths[None, :])
+        scores = np.where(width_gap > 2, scores * 0.5, scores)
+
+        best = scores.argmax(axis=1)
+        conf = scores[np.arange(len(best)), best]
+        text = "".join(self.labels[j] for j in best)
+        if conf.min() < self.min_confidence:
+            return None, conf
+        return text, conf
+
+    def learn(self, binary, text) -> bool:
+        """用已知正確的字串學習字模；切出的字元數需與字串長度相同"""
+        if binary is None or not text:
+            return False
+        vecs, widths = self._glyph_vectors(binary)
+        if vecs is None or len(vecs) != len(text):
+            return False
+
+        with self._lock:  # OCR 池的完成回呼與重讀可能同時學習
+            labels, rows, new_widths = list(self.labels), [], []
+            for ch, vec, w in zip(text, vecs, widths):
+                if ch not in CHARSET or labels.count(ch) >= MAX_SAMPLES_PER_CHAR:
+                    continue
+                labels.append(ch)
+                rows.append(vec)
+                new_widths.append(w)
+            if not rows:
+                return False
+            # 先換 labels 再換陣列：辨識中途讀到時 labels 只會比字模多，不會索引越界
+            self.labels = labels
+            self.templates = np.vstack([self.templates, np.asarray(rows, np.float32)])
+            self.widths = np.append(self.widths, new_widths).astype(np.int32)
+            self.version += 1
+        self._save_quietly()
+        return True
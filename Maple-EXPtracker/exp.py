@@ -2,18 +2,139 @@
 
 import time
 import re
+import json
+import os
+import hashlib
+from collections import namedtuple
 import cv2
 import pytesseract
 import numpy as np
-import pyautogui
+
+from calibration import calibration, scaled
+from capture import buffers, get_capture, to_gray
+from detector import detector
+from digit_ocr import DigitRecognizer
+from profiling import profiler
 
 # 設定 Tesseract 路徑（請依照你的安裝位置調整）
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 
+# ---------- 滑動時間窗速率 ----------
+class RateWindows:
+    """
+    以預先配置的 NumPy 環形緩衝區記錄 (時間, 累積經驗, 累積百分比)。
+    每個時間窗維護一個「窗口起點」索引，新樣本進來時只往前推，攤提 O(1)；
+    速率 = (最新累積值 - 起點累積值) / 經過時間，不必重新掃描歷史。
+    """
+
+    def __init__(self, windows=(60, 300, 600, 3600), capacity=4096):
+        self.windows = tuple(windows)            # 時間窗長度（秒）
+        self.capacity = capacity
+        self.t = np.zeros(capacity, np.float64)
+        self.exp = np.zeros(capacity, np.float64)
+        self.percent = np.zeros(capacity, np.float64)
+        self.count = 0                           # 總共寫入幾筆（絕對索引）
+        self.tails = {w: 0 for w in self.windows}
+
+    def push(self, t, gained_exp, gained_percent):
+        cap = self.capacity
+        i = self.count % cap
+        self.t[i] = t
+        self.exp[i] = gained_exp
+        self.percent[i] = gained_percent
+        self.count += 1
+
+        newest = self.count - 1
+        oldest = max(0, self.count - cap)
+        for w in self.windows:
+            tail = max(self.tails[w], oldest)
+            # 起點保留「剛好在窗口外」的最後一筆，讓時間跨度 >= 窗口長度
+            while tail < newest and self.t[(tail + 1) % cap] <= t - w:
+                tail += 1
+            self.tails[w] = tail
+
+    def span(self, window) -> float:
+        """該時間窗實際涵蓋的秒數"""
+        if self.count == 0:
+            return 0.0
+        cap = self.capacity
+        return float(self.t[(self.count - 1) % cap] - self.t[self.tails[window] % cap])
+
+    def rate(self, window) -> tuple[float, float]:
+        """回傳該時間窗的 (EXP/分鐘, %/分鐘)"""
+        dt = self.span(window)
+        if dt <= 0:
+            return 0.0, 0.0
+        cap = self.capacity
+        head = (self.count - 1) % cap
+        tail = self.tails[window] % cap
+        minutes = dt / 60
+        return (
+            float(self.exp[head] - self.exp[tail]) / minutes,
+            float(self.percent[head] - self.percent[tail]) / minutes,
+        )
+
+
+# ---------- 等級經驗表 ----------
+EXP_TABLE_PATH = "assets/exp_table.json"
+LEVEL_UP_DROP = 10.0   # 死亡最多扣這麼多百分比，一次掉更多一定是升級
+NEED_TOLERANCE = 0.01  # 推算的升級所需經驗變動超過這個比例，視為換了等級
+
+
+def load_exp_table(path=EXP_TABLE_PATH) -> dict:
+    """
+    讀取等級經驗表，格式為 {"等級": 該等級升級所需經驗, ...}
+    檔案不存在時回傳空表，改用 經驗值 / 百分比 推算
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {int(level): int(need) for level, need in json.load(f).items()}
+
+
+def identify_level(exp_table, exp, percent, tolerance=0.02):
+    """由 經驗值 / 百分比 推算出的升級所需經驗，在經驗表中找出最接近的等級"""
+    if not exp_table or not percent or percent <= 0:
+        return None
+    total = exp * 100 / percent
+    level, need = min(exp_table.items(), key=lambda kv: abs(kv[1] - total))
+    if abs(need - total) > need * tolerance:
+        return None
+    return level
+
+
+def is_level_up(last_exp, last_percent, exp, percent, need=None, next_need=None) -> bool:
+    """
+    經驗變少時判斷是升級還是死亡扣經驗。
+    死亡扣經驗不換等級，經驗 / 百分比 推出的升級所需經驗不變；升級後會變成下一級的所需經驗。
+    need / next_need 為經驗表中目前與下一級的所需經驗（有載入經驗表時），否則與上一筆讀數推算的比較。
+    百分比顯示到小數兩位，百分比太小時推算誤差過大，只看百分比是否掉超過 LEVEL_UP_DROP
+    """
+    if exp >= last_exp or percent >= last_percent:
+        return False
+    if last_percent - percent > LEVEL_UP_DROP:
+        return True
+    if percent <= 0 or last_percent <= 0:
+        return False
+    after = exp * 100 / percent
+    error = 0.005 / percent  # 百分比四捨五入造成的相對誤差
+    if need and next_need:
+        return abs(after - next_need) < abs(after - need)
+    if not need:
+        need = last_exp * 100 / last_percent
+        error += 0.005 / last_percent
+    if error > 0.05:
+        return False
+    return abs(after - need) > need * (NEED_TOLERANCE + error)
+
+
 # ---------- 經驗追蹤核心 ----------
 class ExpTracker:
-    def __init__(self):
+    def __init__(self, rate_windows=(1, 5, 10, 60), exp_table=None):
+        self.rate_windows = tuple(rate_windows)  # 滑動時間窗（分鐘）
+        self.exp_table = exp_table if exp_table is not None else load_exp_table()
+        self.recorder = None            # session_log.SessionWriter，設定後每筆樣本都會寫檔
         self.reset()
         self.best_time = None
         self.best_exp_gain = 0          # 最佳經驗值增量（每10分鐘）
@@ -33,31 +154,98 @@ class ExpTracker:
         self.stop_threshold = 60  # 停止閾值（秒）
         self.best_exp_gain = 0
         self.last_10min_exp_gain = 0
-
-    def update(self, exp, percent):
-        now = time.time()
+        self.rates = RateWindows(windows=[m * 60 for m in self.rate_windows])
+        # 升級累計：已跨過的等級所貢獻的經驗與百分比
+        self.level = None
+        self.levels_gained = 0
+        self.exp_offset = 0
+        self.percent_offset = 0.0
+        self.level_need_estimate = None  # 目前等級升級所需經驗（無經驗表時的推算值）
+        self._estimate_percent = 0.0     # 推算值所依據的百分比，越高越準
+
+    def _level_need(self):
+        """目前等級升級所需經驗：優先查表，否則用推算值"""
+        if self.level is not None and self.level in self.exp_table:
+            return self.exp_table[self.level]
+        return self.level_need_estimate
+
+    def _observe_level(self, exp, percent):
+        if self.level is None:
+            self.level = identify_level(self.exp_table, exp, percent)
+        # 百分比越高，經驗值 / 百分比 的推算越準
+        if percent > 0 and percent >= self._estimate_percent:
+            self.level_need_estimate = round(exp * 100 / percent)
+            self._estimate_percent = percent
+
+    def _is_level_up(self, exp, percent) -> bool:
+        if self.last_exp is None:
+            return False
+        need = next_need = None
+        if self.level is not None:
+            need = self.exp_table.get(self.level)
+            next_need = self.exp_table.get(self.level + 1)
+        return is_level_up(self.last_exp, self.last_percent, exp, percent, need, next_need)
+
+    def update(self, exp, percent, now=None):
+        now = time.time() if now is None else now
         if self.start_exp is None:
             self.start_exp = exp
             self.start_percent = percent
             self.start_time = now
-        self.gained_exp = exp - self.start_exp
-        self.gained_percent = percent - self.start_percent
+        elif self._is_level_up(exp, percent):
+            # 升級：把上一級剩下的經驗補進累計，數字才不會變負
+            need = self._level_need()
+            if need is None:
+                need = self.last_exp  # 無從推算時，至少不讓累計倒退
+            self.exp_offset += need
+            self.percent_offset += 100.0
+            self.levels_gained += 1
+            if self.level is not None:
+                self.level += 1
+            self.level_need_estimate = None
+            self._estimate_percent = 0.0
+        self._observe_level(exp, percent)
+
+        self.gained_exp = exp + self.exp_offset - self.start_exp
+        self.gained_percent = percent + self.percent_offset - self.start_percent
         self.last_exp = exp
         self.last_percent = percent
         self.last_update = now
 
+        self.rates.push(now, self.gained_exp, self.gained_percent)
+        if self.recorder is not None:
+            self.recorder.record_exp(now, exp, percent, self.gained_exp)
+        # 最佳紀錄取「完整的」滑動10分鐘增量，而非整段平均
+        if self._rolling_10min_ready():
+            gain_10min = int(self.rates.rate(600)[0] * 10)
+            if gain_10min > self.best_exp_gain:
+                self.best_exp_gain = gain_10min
+        # 估算只用累計值，O(1)，每筆樣本都更新，不必等計時器
+        self.update_estimate(now)
+
+    def _rolling_10min_ready(self) -> bool:
+        return 600 in self.rates.windows and self.rates.span(600) >= 600
+
+    def rate(self, minutes) -> float:
+        """最近 minutes 分鐘的 EXP/分鐘（minutes 需為 rate_windows 之一）"""
+        return self.rates.rate(minutes * 60)[0]
+
+    def current_rates(self) -> dict:
+        """所有時間窗的 EXP/分鐘，例如 {1: ..., 5: ..., 10: ..., 60: ...}"""
+        return {m: self.rates.rate(m * 60)[0] for m in self.rate_windows}
+
     def is_stopped(self):
         if self.last_update is None:
             return False
         return time.time() - self.last_update > self.stop_threshold
 
-    def runtime(self):
+    def runtime(self, now=None):
         if self.start_time is None:
             return 0
-        return time.time() - self.start_time
+        return (time.time() if now is None else now) - self.start_time
 
-    def update_estimate(self):
-        elapsed_min = self.runtime() / 60
+    def update_estimate(self, now=None):
+        elapsed_min = self.runtime(now) / 60
         if elapsed_min < 0.1:
             self.percent_per_10min = 0
             self.estimated_time = 0
@@ -71,8 +259,9 @@ class ExpTracker:
         rate_exp = self.gained_exp / elapsed_min
         self.last_10min_exp_gain = int(rate_exp * 10)
 
-        # 更新最大記錄
-        if self.last_10min_exp_gain > self.best_exp_gain:
+        # 更新最大記錄（滑動窗還沒滿10分鐘時，先用整段平均；開頭幾分鐘外推誤差太大不記）
+        if (self.last_10min_exp_gain > self.best_exp_gain and elapsed_min >= 10
+                and not self._rolling_10min_ready()):
             self.best_exp_gain = self.last_10min_exp_gain
 
         if rate_percent > 0:
@@ -103,74 +292,310 @@ class MesoTracker:
 
 
 # ---------- OCR 辨識 ----------
-def read_exp_and_percent(img) -> tuple[int | None, float | None]:
+# 先用程序內的字模辨識，信心不足才呼叫 Tesseract，並用 Tesseract 的結果學習字模
+digit_reader = DigitRecognizer("assets/glyphs.npz")
+
+
+class ChangeGate:
     """
-    從圖片中讀取經驗值與百分比，例如格式：440740[13.21%]
+    畫面變化閘門：每個區域記住上一張二值化字串圖的雜湊，
+    內容沒變就直接沿用上次的辨識結果，不再跑 OCR。
     """
-    if img is None:
-        return None, None
-
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 130, 255, cv2.THRESH_BINARY_INV)
 
-    config = "--psm 7 -c tessedit_char_whitelist=0123456789[].% "
-    text = pytesseract.image_to_string(thresh, config=config).strip()
+    def __init__(self):
+        self.signatures = {}   # 區域名稱 -> 上次的雜湊
+        self.results = {}      # 區域名稱 -> 上次的辨識結果
+        self.checks = 0
+        self.skips = 0
+
+    @staticmethod
+    def signature(thresh) -> bytes:
+        h = hashlib.blake2b(digest_size=8)
+        h.update(repr(thresh.shape).encode())
+        h.update(memoryview(np.ascontiguousarray(thresh)))  # 直接雜湊緩衝內容，不複製成 bytes
+        return h.digest()
+
+    def lookup(self, key, sig):
+        """回傳 (是否沿用, 上次結果)"""
+        self.checks += 1
+        if self.signatures.get(key) == sig:
+            self.skips += 1
+            return True, self.results[key]
+        return False, None
+
+    def store(self, key, sig, result):
+        self.signatures[key] = sig
+        self.results[key] = result
 
-    match = re.search(r"(\d+)\s*\[\s*(\d+\.\d+)%\s*\]", text)
+    def reset(self):
+        self.signatures.clear()
+        self.results.clear()
+
+    def skip_ratio(self) -> float:
+        return self.skips / self.checks if self.checks else 0.0
+
+    def stats(self) -> dict:
+        return {"checks": self.checks, "skips": self.skips, "skip_ratio": self.skip_ratio()}
+
+
+ocr_gate = ChangeGate()
+profiler.add_stats("ocr_gate", ocr_gate.stats)
+
+# 每種區域的辨識設定：二值化門檻、Tesseract 參數、格式、解析方式、讀不到時的值
+# 之後要讀其他數字（例如藥水數量）只要在這裡加一項
+OcrKind = namedtuple("OcrKind", ["threshold", "mode", "config", "pattern", "parse", "empty"])
+
+OCR_KINDS = {
+    # 經驗值與百分比，例如 440740[13.21%]
+    "exp": OcrKind(130, cv2.THRESH_BINARY_INV, "--psm 7 -c tessedit_char_whitelist=0123456789[].% ",
+                   r"(\d+)\s*\[\s*(\d+\.\d+)%\s*\]",
+                   lambda m: (int(m.group(1)), float(m.group(2))), (None, None)),
+    # 金幣總額，例如 1,234,567
+    "meso": OcrKind(150, cv2.THRESH_BINARY, "--psm 7 -c tessedit_char_whitelist=0123456789,",
+                    r"[\d,]+", lambda m: int(m.group().replace(",", "")), None),
+}
+
+# 每個區域最近一次辨識的最低逐字信心（字模辨識才有，Tesseract 讀的為 None），給 validation 使用
+ocr_confidence = {kind: None for kind in OCR_KINDS}
+
+
+def warm_up_ocr() -> bool:
+    """啟動暖機用：先呼叫一次 Tesseract（確認可用，執行檔也進了磁碟快取）；字模在匯入時已載入"""
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception as e:
+        print("Tesseract 無法使用，只用內建字模辨識:", e)
+        return False
+
+
+def _run_tesseract(thresh, config):
+    return pytesseract.image_to_string(thresh, config=config)
+
+
+def _ocr_match(thresh, config, pattern, tesseract_only=False, tesseract=_run_tesseract, learn=True):
+    """回傳 (match, 最低逐字信心)；由 Tesseract 讀出時信心為 None，learn=True 時順便學字模"""
+    if not tesseract_only:
+        with profiler.stage("ocr"):
+            text, conf = digit_reader.recognize(thresh)
+        if text is not None:
+            with profiler.stage("parse"):
+                match = re.fullmatch(pattern, text)
+            if match:
+                return match, float(conf.min())
+
+    with profiler.stage("ocr_tesseract"):
+        text = tesseract(thresh, config).strip()
+    with profiler.stage("parse"):
+        match = re.search(pattern, text)
     if not match:
-        return None, None
-    exp = int(match.group(1))
-    percent = float(match.group(2))
-    return exp, percent
+        profiler.count("ocr_fail")
+    elif learn:
+        digit_reader.learn(thresh, re.sub(r"\s+", "", match.group()))
+    return match, None
 
 
-def read_meso_amount(img) -> int | None:
+def binarize(kind, img, tag=None):
     """
-    從金幣圖像中讀取金幣總額，例如 1,234,567
+    依區域設定轉成二值化字串圖（img 可為 BGR 或已是灰階）。
+    tag 不為 None 時結果寫進該用途的共用緩衝，下次同 tag 會被覆寫；
+    要交給其他行程或之後才用的（例如 OCR 池）不給 tag，另外配置
+    """
+    spec = OCR_KINDS[kind]
+    with profiler.stage("threshold"):
+        gray = to_gray(img, f"{kind}_gray")
+        dst = buffers.get(tag, gray.shape) if tag is not None else None
+        _, thresh = cv2.threshold(gray, spec.threshold, 255, spec.mode, dst=dst)
+    return thresh
+
+
+def ocr_text(kind, thresh, tesseract_only=False, tesseract=_run_tesseract, learn=True):
+    """
+    辨識二值化字串圖，回傳 (符合格式的文字或 None, 最低逐字信心)。
+    OCR 工作行程也用這個，tesseract 可換成常駐的引擎、learn=False 不學字模（見 ocr_pool.py）
+    """
+    spec = OCR_KINDS[kind]
+    match, conf = _ocr_match(thresh, spec.config, spec.pattern, tesseract_only, tesseract, learn)
+    return (match.group() if match else None), conf
+
+
+def parse_text(kind, text):
+    """把 ocr_text 的文字轉成讀數"""
+    spec = OCR_KINDS[kind]
+    match = re.search(spec.pattern, text) if text else None
+    return spec.parse(match) if match else spec.empty
+
+
+def read_region(kind, img, reread=False, key=None):
     """
+    讀取一塊區域（kind 見 OCR_KINDS）。字串圖沒變就沿用上次結果（仍算一次有效取樣）。
+    reread=True：讀數可疑時的重讀，不沿用快取，直接用 Tesseract 當第二個獨立意見
+    key：快取與 ocr_confidence 的鍵，預設為 kind；多開時每個 client 各用自己的鍵
+    """
+    spec = OCR_KINDS[kind]
+    key = key or kind
     if img is None:
-        return None
+        return spec.empty
+    thresh = binarize(kind, img, tag=f"{key}_thresh")  # 不可與截圖用的緩衝同名，否則會蓋掉呼叫端的影像
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+    sig = ocr_gate.signature(thresh)
+    if not reread:
+        same, result = ocr_gate.lookup(key, sig)
+        if same:
+            profiler.count("ocr_skipped")
+            return result
 
-    config = "--psm 7 -c tessedit_char_whitelist=0123456789,"
-    text = pytesseract.image_to_string(thresh, config=config).strip()
+    text, ocr_confidence[key] = ocr_text(kind, thresh, reread)
+    result = parse_text(kind, text)
+    ocr_gate.store(key, sig, result)
+    return result
 
-    match = re.search(r"[\d,]+", text)
-    if not match:
-        return None
 
-    return int(match.group().replace(",", ""))
+def read_exp_and_percent(img, reread=False) -> tuple[int | None, float | None]:
+    """
+    從圖片中讀取經驗值與百分比，例如格式：440740[13.21%]
+    """
+    return read_region("exp", img, reread)
 
 
-# ---------- 圖片擷取 ----------
-def find_template_on_screen(template_path, confidence=0.8):
-    screen = pyautogui.screenshot()
-    screen = cv2.cvtColor(np.array(screen), cv2.COLOR_RGB2BGR)
-    template = cv2.imread(template_path, cv2.IMREAD_COLOR)
+def read_meso_amount(img, reread=False) -> int | None:
+    """
+    從金幣圖像中讀取金幣總額，例如 1,234,567
+    """
+    return read_region("meso", img, reread)
 
-    result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-    _, max_val, _, max_loc = cv2.minMaxLoc(result)
 
-    if max_val >= confidence:
-        return max_loc
-    return None
+# ---------- 圖片擷取 ----------
+class AnchorLocator:
+    """
+    錨點快取：記住模板上次出現的位置，之後只在附近小範圍比對，
+    比對失敗才重新整張螢幕搜尋。
+    計數器：hits（小範圍命中）、misses（小範圍失敗）、relocates（整張螢幕重新搜尋次數）
+    模板會依 calibration 的縮放比例調整；calibrate=True 的 locator 負責在新解析度下執行校正。
+    整張搜尋交給共用的 detector：一次偵測所有註冊的模板，其他 locator 的位置也會一起更新
+    """
+
+    def __init__(self, template_path, confidence=0.8, margin=16, calibrate=False):
+        self.name = template_path
+        self.template_path = template_path
+        self.confidence = confidence
+        self.margin = margin  # 小範圍檢查時往外擴的像素（2560x1440 下）
+        self.calibrate = calibrate
+        self.scale = 1.0
+        self.template = None
+        self.last_pos = None
+        self.hits = 0
+        self.misses = 0
+        self.relocates = 0
+        self.full_failures = 0           # 連續整張搜尋失敗次數
+        self._last_calibration = 0.0     # 上次嘗試校正的時間
+        detector.register(self.name, template_path, confidence=confidence)
+        detector.subscribe(self._on_detection)
+
+    def _on_detection(self, results):
+        """任何一次整張偵測（不論是誰觸發）找到這個模板時，更新快取位置"""
+        found = results.get(self.name)
+        if found is not None:
+            self.last_pos = (found.x, found.y)
+            self.scale = detector.last_scale  # 偵測時用的縮放比例，之後小範圍比對也要一致
+
+    def _load_template(self):
+        # 由共用模板快取取得（依縮放比例），檔案更新時會自動換成新圖
+        self.template = calibration.scaled_template(self.template_path, self.scale)
+        return self.template
+
+    def _update_scale(self, screen):
+        """依目前畫面尺寸取得縮放比例，沒有紀錄時（最多每分鐘一次）執行校正"""
+        size = (screen.shape[1], screen.shape[0])
+        scale = calibration.get(size)
+        if scale is None and self.calibrate and time.time() - self._last_calibration > 60:
+            self._last_calibration = time.time()
+            scale = calibration.calibrate(screen, self.template_path, size)
+        self.scale = scale if scale is not None else 1.0
+
+    def _check_window(self, template):
+        """只截取上次位置附近的小區塊比對"""
+        th, tw = template.shape[:2]
+        margin = scaled(self.margin, self.scale)
+        x, y = self.last_pos
+        left = max(x - margin, 0)
+        top = max(y - margin, 0)
+        region = (left, top, tw + 2 * margin, th + 2 * margin)
+        window = get_capture().grab(region)
+        if window is None or window.shape[0] < th or window.shape[1] < tw:
+            return None
+
+        with profiler.stage("match"):
+            result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val < self.confidence:
+            return None
+        return left + max_loc[0], top + max_loc[1]
+
+    def locate(self, allow_full=True):
+        """
+        allow_full=False 時只檢查上次位置附近，不做整張螢幕搜尋，
+        也不清除快取位置（例如背包暫時關著）
+        """
+        if self.last_pos is not None:
+            template = self._load_template()
+            if template is None:
+                return None
+            pos = self._check_window(template)
+            if pos is not None:
+                self.hits += 1
+                self.last_pos = pos
+                return pos
+            self.misses += 1
+        if not allow_full:
+            return None
+
+        # 快取失效（或第一次），整張螢幕重新搜尋（偵測與校正都只用灰階）
+        self.relocates += 1
+        screen = get_capture().grab_gray(tag="screen")
+        if screen is None:
+            return None
+        self._update_scale(screen)
+        self._load_template()
+        found = detector.detect(screen).get(self.name)
+        if found is None:
+            self.last_pos = None
+            self.full_failures += 1
+            if self.calibrate and self.full_failures >= 3:
+                # 一直找不到，可能 UI 縮放變了：丟掉這個尺寸的校正，下次重新校正
+                calibration.invalidate((screen.shape[1], screen.shape[0]))
+                self.full_failures = 0
+            return None
+        self.full_failures = 0
+        return self.last_pos
+
+    def invalidate(self):
+        self.last_pos = None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "relocates": self.relocates, "scale": self.scale}
+
+
+exp_locator = AnchorLocator("assets/EXP.png", confidence=0.8, calibrate=True)
 
 
 def capture_exp_bar() -> np.ndarray | None:
     """
-    找到 EXP.png 後，擷取其右方 400x20 的區塊（顯示數字用）
+    找到 EXP.png 後，擷取其右方 400x20 的區塊（顯示數字用，直接截成灰階）
+    錨點位置由 exp_locator 快取，不必每次整張螢幕比對；
+    偏移與大小以 2560x1440 為基準，依校正出的縮放比例換算
     """
-    pos = find_template_on_screen("assets/EXP.png", confidence=0.8)
+    pos = exp_locator.locate()
     if not pos:
         return None
+    return get_capture().grab_gray(exp_bar_region(pos, exp_locator.scale), tag="exp")
+
+
+def exp_bar_region(pos, s) -> tuple:
+    """由 EXP.png 的位置推出數字區域 (left, top, width, height)"""
     x, y = pos
-    x += 50  # 避開 EXP 字樣本體
-    region = (x+15, y, 400, 100)
-    img = pyautogui.screenshot(region=region)
-    img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-    return img
+    x += scaled(50, s)  # 避開 EXP 字樣本體
+    return x + scaled(15, s), y, scaled(400, s), scaled(100, s)
 
 
 # ---------- 工具函數 ----------
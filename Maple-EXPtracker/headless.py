@@ -0,0 +1,289 @@
+# headless.py
+# 無介面模式：不載入 Qt，只跑截圖 + OCR + 經驗/金幣追蹤，把結果以 NDJSON（一行一筆 JSON）輸出
+#
+# 用法：
+#   python headless.py                               # 輸出到 stdout
+#   python headless.py --listen 8765                 # 另外在 127.0.0.1:8765 開放給本機其他程式連線讀取
+#   python headless.py --replay recordings/ --frame-interval 2    # 用錄好的畫面（資料夾或影片）盡快跑完
+#   python headless.py --per-monitor                 # 多開：每個螢幕一個遊戲視窗
+#   python headless.py --client a=0,0,1280,720 --client b=1280,0,1280,720    # 多開：指定各視窗矩形
+#
+# 輸出格式（多開時每筆 sample / rates 另有 "client": 名稱）：
+#   {"type": "start", "startup_ms": ..., "mode": "live" | "replay", "clients": [名稱, ...]}
+#   {"type": "sample", "t": ..., "exp": ..., "percent": ..., "meso": ...}
+#   {"type": "rates", "t": ..., "gained_exp": ..., "gained_percent": ..., "exp_per_min": {"1": ..., ...},
+#    "percent_per_10min": ..., "eta_s": ..., "level": ..., "levels_gained": ..., "meso": ..., "meso_gained": ...}
+#   {"type": "end", "samples": ..., "ocr_gate": {"checks": ..., "skips": ..., "skip_ratio": ...}, "profile": {...}}
+#
+# 其他模組的 print 訊息改寫到 stderr，stdout 只有 NDJSON
+#
+
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import json
+import queue
+import socket
+import sys
+import threading
+
+from capture import MssCapture, ReplayCapture, get_capture, set_capture
+from clients import ClientContext, MultiClientTracker, monitor_clients, parse_client
+from ocr_pool import OcrPool
+from pipeline import AcquisitionWorker, SampleScheduler, sampling_cpu_time
+from profiling import profiler
+from session_log import SessionWriter
+
+
+SEND_TIMEOUT = 0.2  # 用戶端連線後不讀取、緩衝區滿了就等這麼久，之後斷開它，不拖住取樣
+
+
+class NdjsonSink:
+    """把 dict 轉成一行 JSON，寫到 stream 以及所有已連線的本機 socket 用戶端（跟不上的用戶端會被斷開）"""
+
+    def __init__(self, stream=None, listen_port=None):
+        self.stream = stream
+        self.clients = []
+        self._lock = threading.Lock()
+        self._server = None
+        if listen_port is not None:
+            self._server = socket.create_server(("127.0.0.1", listen_port))
+            threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while self._server is not None:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            conn.settimeout(SEND_TIMEOUT)
+            with self._lock:
+                self.clients.append(conn)
+
+    def emit(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        if self.stream is not None:
+            self.stream.write(line)
+            self.stream.flush()
+        if self._server is None:
+            return
+        data = line.encode("utf-8")
+        with self._lock:
+            for conn in list(self.clients):
+                try:
+                    conn.sendall(data)
+                except OSError:  # 含 socket.timeout
+                    # 用戶端離線或跟不上（可能只送出一部分，之後的資料也不完整）就移除
+                    self.clients.remove(conn)
+                    conn.close()
+
+    def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        with self._lock:
+            for conn in self.clients:
+                conn.close()
+            self.clients.clear()
+
+
+class HeadlessTracker:
+    """接收 Sample，記進 client（ExpTracker / MesoTracker），輸出 sample 與 rates 兩種紀錄"""
+
+    def __init__(self, sink, client=None, session=None, tag=False):
+        self.sink = sink
+        self.client = client or ClientContext("main", None)
+        self.tag = tag  # 多開時在紀錄中加上 client 名稱
+        self.tracker = self.client.tracker
+        self.meso_tracker = self.client.meso_tracker
+        self.session = session
+        self.tracker.recorder = session
+        self.meso_tracker.recorder = session
+        self.count = 0
+
+    def _emit(self, record):
+        if self.tag:
+            record["client"] = self.client.name
+        self.sink.emit(record)
+
+    def handle(self, sample):
+        self.count += 1
+        self._emit({"type": "sample", "t": sample.timestamp, "exp": sample.exp,
+                    "percent": sample.percent, "meso": sample.meso})
+        self.client.record(sample)
+        self._emit(self.rates(sample.timestamp))
+
+    def rates(self, now) -> dict:
+        t = self.tracker
+        meso_now, meso_gained = self.meso_tracker.get_meso_info()
+        return {
+            "type": "rates",
+            "t": now,
+            "gained_exp": int(t.gained_exp),
+            "gained_percent": round(float(t.gained_percent), 4),
+            "exp_per_min": {str(m): round(r, 2) for m, r in t.current_rates().items()},
+            "percent_per_10min": round(float(t.percent_per_10min), 4),
+            "eta_s": t.estimated_time,
+            "level": t.level,
+            "levels_gained": t.levels_gained,
+            "meso": meso_now,
+            "meso_gained": meso_gained,
+        }
+
+    def close(self):
+        if self.session is None:
+            return
+        t = self.tracker
+        self.session.close(summary={
+            "gained_exp": int(t.gained_exp),
+            "gained_percent": float(t.gained_percent),
+            "levels_gained": t.levels_gained,
+            "best_exp_gain": int(t.best_exp_gain),
+            "best_time": t.best_time,
+            "meso_gained": int(self.meso_tracker.get_meso_info()[1]),
+            "runtime": t.runtime(t.last_update),
+        })
+        self.session = None
+
+
+def run_live(app, worker):
+    """即時模式：背景工作執行緒取樣，主執行緒輸出，Ctrl+C 結束"""
+    worker.start()
+    worker.set_active(True)
+    try:
+        while True:
+            try:
+                app.handle(worker.samples.get(timeout=1.0))
+            except queue.Empty:
+                pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+
+
+def run_replay(app, worker, source, frame_interval):
+    """重播模式：逐張讀取，不等待；時間戳記以 frame_interval 遞增"""
+    worker.read_meso = True
+    start = time.time()
+    index = 0
+    while source.frame is not None:
+        sample, _ = worker.sample(timestamp=start + index * frame_interval, advance=index > 0)
+        if source.frame is None:
+            break  # 已播完
+        app.handle(sample)
+        index += 1
+
+
+def run_clients(apps, multi, scheduler, source=None, frame_interval=2.0):
+    """
+    多開：每次 tick 截一次畫面、所有 client 共用錨點搜尋，OCR 依 client 分開。
+    即時模式依 scheduler 決定間隔（任一 client 經驗有變就加快）；重播模式逐張跑完
+    """
+    start = time.time()
+    index = 0
+    try:
+        while True:
+            if source is not None:
+                if index > 0 and not source.next_frame():
+                    break
+                now = start + index * frame_interval
+            else:
+                now = time.time()
+            tick_start = sampling_cpu_time(multi.ocr_pool)
+            results = multi.tick(now)
+            changed = visible = False
+            for client, sample in results:
+                if sample.exp is not None:
+                    visible = True
+                    last = client.tracker.last_exp, client.tracker.last_percent
+                    changed = changed or (sample.exp, sample.percent) != last
+                apps[client.name].handle(sample)
+            delay = scheduler.next_interval(changed, visible, sampling_cpu_time(multi.ocr_pool) - tick_start)
+            index += 1
+            if source is None:
+                time.sleep(delay)
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="無介面經驗追蹤，輸出 NDJSON")
+    parser.add_argument("--listen", type=int, metavar="PORT", help="在 127.0.0.1:PORT 開放 NDJSON 串流")
+    parser.add_argument("--no-stdout", action="store_true", help="不輸出到 stdout（搭配 --listen）")
+    parser.add_argument("--replay", metavar="PATH", help="改用錄好的畫面（資料夾或影片）")
+    parser.add_argument("--frame-interval", type=float, default=2.0, help="重播時每張畫面代表的秒數")
+    parser.add_argument("--passive-meso", action="store_true", help="只在背包已開啟時讀金幣，不自動按 i")
+    parser.add_argument("--cpu-budget", type=float, default=0.05, help="取樣最多使用一顆 CPU 核心的比例")
+    parser.add_argument("--ocr-workers", type=int, default=0, help="OCR 工作行程數（0 表示不使用行程池）")
+    parser.add_argument("--client", action="append", default=[], metavar="NAME=L,T,W,H",
+                        help="多開：一個遊戲視窗的名稱與矩形（相對於所有螢幕合成的虛擬桌面），可重複")
+    parser.add_argument("--per-monitor", action="store_true", help="多開：每個螢幕一個遊戲視窗")
+    parser.add_argument("--session", action="store_true", help="同時寫入 sessions/ 紀錄檔")
+    parser.add_argument("--map", default="", help="目前練功的地圖名稱（記錄在 session 中）")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout
+    sys.stdout = sys.stderr  # 其他模組的訊息不要混進 NDJSON
+    sink = NdjsonSink(stream=None if args.no_stdout else out, listen_port=args.listen)
+
+    ocr_pool = OcrPool(args.ocr_workers) if args.ocr_workers > 0 else None
+    source = None
+    if args.replay:
+        source = ReplayCapture(args.replay)
+        set_capture(source)
+
+    clients = [parse_client(spec) for spec in args.client]
+    if args.per_monitor:
+        clients += monitor_clients()
+    if clients and source is None:
+        set_capture(MssCapture(monitor_index=0))  # 一次截取所有螢幕，座標相對於虛擬桌面
+
+    if clients:
+        apps = {
+            c.name: HeadlessTracker(
+                sink, client=c, tag=True,
+                session=SessionWriter(metadata={"map": args.map, "client": c.name}, name=c.name) if args.session else None,
+            )
+            for c in clients
+        }
+        multi = MultiClientTracker(clients, ocr_pool=ocr_pool)
+    else:
+        session = SessionWriter(metadata={"map": args.map}) if args.session else None
+        apps = {"main": HeadlessTracker(sink, session=session)}
+        worker = AcquisitionWorker(
+            scheduler=SampleScheduler(cpu_budget=args.cpu_budget),
+            # 重播時沒有遊戲可以按鍵
+            meso_active_fallback=not (args.passive_meso or args.replay),
+            ocr_pool=ocr_pool,
+        )
+
+    sink.emit({"type": "start", "startup_ms": round((time.perf_counter() - _T0) * 1000, 1),
+               "mode": "replay" if args.replay else "live", "clients": list(apps)})
+    try:
+        if clients:
+            run_clients(apps, multi, SampleScheduler(cpu_budget=args.cpu_budget), source, args.frame_interval)
+        elif args.replay:
+            run_replay(apps["main"], worker, source, args.frame_interval)
+        else:
+            run_live(apps["main"], worker)
+    finally:
+        if clients:
+            if ocr_pool is not None:
+                ocr_pool.close()
+        else:
+            worker.stop()
+        for app in apps.values():
+            app.close()
+        summary = profiler.summary()
+        sink.emit({"type": "end", "samples": sum(app.count for app in apps.values()),
+                   "ocr_gate": summary["stats"].get("ocr_gate"), "profile": summary})
+        sink.close()
+        get_capture().close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,15 +2,25 @@
 import threading
 import time
 import random
-import mss
-import cv2
-import numpy as np
-import pyautogui
+
+from capture import get_capture
+from detector import detector
+from profiling import profiler
+
+# 登入按鈕可能出現的區域（以畫面比例表示：left, top, width, height）
+LOGIN_ROI = (0.2, 0.2, 0.6, 0.7)
+SELECT_ROI = (0.2, 0.2, 0.8, 0.8)
+FULL_FRAME_EVERY = 5  # 每幾輪在 ROI 外也搜尋一次整張畫面，以防按鈕位置不同
+
+detector.register("login", "assets/login.png", confidence=0.8, roi=LOGIN_ROI, group="login")
+detector.register("select", "assets/select.png", confidence=0.8, roi=SELECT_ROI, group="login")
 
 class LoginChannelController:
     def __init__(self):
         self.running = False
         self.thread = None
+        self.iterations = 0
+        self.last_report = None  # 最近一次偵測的 {"latency_ms": ..., "scores": {...}}
 
     def start(self):
         if not self.running:
@@ -25,40 +35,47 @@ class LoginChannelController:
             self.thread = None
 
     def _run(self):
-        with mss.mss() as sct:
-            monitor = sct.monitors[1]
-            while self.running:
-                screen = np.array(sct.grab(monitor))
-                screen = cv2.cvtColor(screen, cv2.COLOR_BGRA2BGR)
+        source = get_capture()
+        while self.running:
+            source.next_frame()
+            screen = source.grab_gray(tag="login")  # 按鈕偵測只用灰階，截圖時一次轉好
+            if screen is None:
+                time.sleep(random.uniform(3, 5))
+                continue
 
-                login_loc = self._find_image(screen, "assets/login.png")
-                select_loc = self._find_image(screen, "assets/select.png")
+            found = self._detect(screen)
+            login_loc = found.get("login")
+            select_loc = found.get("select")
 
-                if login_loc:
-                    self._click_random_pos(login_loc)
-                    time.sleep(1)  # 等一秒再點第二次
-                    self._click_random_pos(login_loc)
+            if login_loc:
+                self._click_random_pos(login_loc)
+                time.sleep(1)  # 等一秒再點第二次
+                self._click_random_pos(login_loc)
 
-                if select_loc:
-                    self._click_random_pos(select_loc)
-                    self.running = False  # 停止登入流程
-                    break
+            if select_loc:
+                self._click_random_pos(select_loc)
+                self.running = False  # 停止登入流程
+                break
 
-                time.sleep(random.uniform(3, 5))  # ✅ 改成隨機間隔
+            time.sleep(random.uniform(3, 5))  # ✅ 改成隨機間隔
 
-    def _find_image(self, haystack, needle_path, threshold=0.8):
-        needle = cv2.imread(needle_path)
-        if needle is None:
-            return None
-        res = cv2.matchTemplate(haystack, needle, cv2.TM_CCOEFF_NORMED)
-        loc = np.where(res >= threshold)
-        points = list(zip(*loc[::-1]))
-        if points:
-            return points[0], needle.shape[1], needle.shape[0]
-        return None
+    def _detect(self, screen) -> dict:
+        """同一張畫面一次找出登入與選角按鈕，並記錄分數與耗時"""
+        self.iterations += 1
+        full_frame = self.iterations % FULL_FRAME_EVERY == 0
+        start = time.perf_counter()
+        found = detector.detect(screen, group="login", full_frame=full_frame)
+        latency_ms = (time.perf_counter() - start) * 1000
+        profiler.record("login_detect", latency_ms)
+        self.last_report = {
+            "latency_ms": latency_ms,
+            "scores": {name: detector.last_scores.get(name) for name in found},
+        }
+        return found
 
     def _click_random_pos(self, loc):
-        (x, y), w, h = loc
+        import pyautogui  # 需要桌面環境，只在真的要點擊時才載入
+        x, y, w, h = loc.x, loc.y, loc.w, loc.h
         rand_x = x + random.randint(-10, w + 10)  # ✅ 弧度更大
         rand_y = y + random.randint(-10, h + 10)
         pyautogui.moveTo(rand_x, rand_y, duration=random.uniform(0.5, 1.2), tween=pyautogui.easeInOutQuad)
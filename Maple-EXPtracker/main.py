@@ -8,23 +8,31 @@
 # - 視窗可任意拖曳，按鈕仍可正常點擊
 #
 
+import time
+
+_T0 = time.perf_counter()  # 啟動計時起點（--startup-profile）
+
+import argparse
 import sys
+import threading
 from pathlib import Path
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QSizePolicy
 )
-from PySide6.QtCore import Qt, QTimer, QSize
+from PySide6.QtCore import Qt, QTimer, QSize, QRect, QPointF, QObject, Signal
 from PySide6.QtGui import (
     QColor, QPainter, QFont, QPixmap, QPainterPath, QPen, QLinearGradient, QBrush, QFontMetrics
 )
 
-from exp import ExpTracker, capture_exp_bar, read_exp_and_percent, format_time, cute_evaluation
-from loging import LoginChannelController
-from meso import MesoTracker
+# exp / meso / loging / pipeline / session_log 會載入 cv2、pytesseract、mss 等重量級套件，
+# 改在視窗顯示後由背景暖機執行緒匯入（見 ExpApp._warm_up）
+from profiling import StartupTimer, profiler
 
 ASSETS_DIR = Path("assets")  # 資源資料夾
 
+startup = StartupTimer(_T0)
+
 
 # ---------------------------------------
 # 自訂多行描邊文字元件
@@ -62,6 +70,13 @@ class MultiLineOutlined(QWidget):
         # 動畫階段（0..1循環）
         self.phase = 0.0
 
+        # 繪製快取：文字路徑、預先畫好的描邊圖層、流光漸層
+        self._paths = [None] * lines
+        self._layer = None
+        self._shimmer_lines = []
+        self._shimmer_rect = None
+        self._gradients = {}
+
         # 動畫 timer，觸發重繪
         self.anim_timer = QTimer(self)
         self.anim_timer.setInterval(70)
@@ -75,106 +90,156 @@ class MultiLineOutlined(QWidget):
         """設定字型"""
         self._font = f
         super().setFont(f)
-        self.update()
+        self._invalidate()
 
     def set_lines(self, texts: list):
         """一次設定多行文字"""
+        changed = False
         for i, t in enumerate(texts[:self.lines_count]):
-            self.texts[i] = t
-        self.update()
+            if self.texts[i] != t:
+                self.texts[i] = t
+                changed = True
+        if changed:
+            self._invalidate()
 
     def set_line(self, idx: int, text: str):
         """設定特定行的文字"""
-        if 0 <= idx < self.lines_count:
+        if 0 <= idx < self.lines_count and self.texts[idx] != text:
             self.texts[idx] = text
-            self.update()
+            self._invalidate()
 
     def set_line_style(self, idx: int, mode="solid", solid_color=QColor(255, 255, 255), gradient_colors=None):
-        """設定特定行的繪製模式與顏色"""
-        if 0 <= idx < self.lines_count:
-            self.modes[idx] = mode
-            self.solid_colors[idx] = solid_color
-            if gradient_colors:
-                self.gradient_colors[idx] = gradient_colors
-            self.update()
+        """設定特定行的繪製模式與顏色（與目前相同時不重繪）"""
+        if not 0 <= idx < self.lines_count:
+            return
+        gradient_colors = gradient_colors or self.gradient_colors[idx]
+        if (self.modes[idx] == mode and self.solid_colors[idx] == solid_color
+                and self.gradient_colors[idx] == gradient_colors):
+            return
+        self.modes[idx] = mode
+        self.solid_colors[idx] = solid_color
+        self.gradient_colors[idx] = gradient_colors
+        self._invalidate()
 
     def set_outline(self, color: QColor, width: float = 1.0):
         """設定描邊顏色與寬度"""
         self.outline_color = color
         self.outline_width = width
+        self._invalidate()
+
+    def _invalidate(self):
+        """文字、樣式或大小改變：丟掉靜態圖層，下次繪製時重建"""
+        self._layer = None
         self.update()
 
     def _on_anim(self):
-        """動畫更新，更新 phase 並重繪"""
+        """動畫更新，更新 phase，只重繪有流光的行"""
         self.phase += 0.02
         if self.phase > 1.0:
             self.phase -= 1.0
-        self.update()
-
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setFont(self._font)
-        fm = painter.fontMetrics()
+        if self._shimmer_rect is None:
+            self.update()  # 靜態圖層尚未建立
+        elif not self._shimmer_rect.isEmpty():
+            self.update(self._shimmer_rect)
+
+    def resizeEvent(self, event):
+        self._gradients.clear()  # 漸層範圍跟著寬度
+        self._invalidate()
+        super().resizeEvent(event)
+
+    def _line_path(self, i, y):
+        """第 i 行的文字路徑，依 (文字, 字型, baseline) 快取"""
+        key = (self.texts[i], self._font.key(), y)
+        cached = self._paths[i]
+        if cached is None or cached[0] != key:
+            path = QPainterPath()
+            path.addText(8, y, self._font, self.texts[i])  # 文字靠左，x偏移8像素
+            cached = self._paths[i] = (key, path)
+        return cached[1]
 
+    def _visible_lines(self):
+        """回傳 (行號, 路徑)；空白行略過"""
+        fm = QFontMetrics(self._font)
         ascent = fm.ascent()
-        descent = fm.descent()
-        line_height = ascent + descent
+        line_height = ascent + fm.descent()
 
-        # 開始畫第一行文字 baseline，保留少許頂部 margin
+        # 第一行文字 baseline，保留少許頂部 margin
         top_margin = 2
         y = top_margin + ascent
-
-        rect = self.contentsRect()
-
+        lines = []
         for i in range(self.lines_count):
-            text = self.texts[i]
-            if not text:
-                y += line_height + self.line_gap
-                continue
-
-            # 建立文字路徑，文字靠左，x偏移8像素
-            path = QPainterPath()
-            text_x = 8
-            path.addText(text_x, y, self._font, text)
+            if self.texts[i]:
+                lines.append((i, self._line_path(i, y)))
+            y += line_height + self.line_gap  # 下一行 baseline（加上行距）
+        return lines
+
+    def _build_layer(self):
+        """把描邊與固定顏色的行預先畫進 QPixmap，流光行只留描邊"""
+        ratio = self.devicePixelRatioF()
+        layer = QPixmap(max(1, int(self.width() * ratio)), max(1, int(self.height() * ratio)))
+        layer.setDevicePixelRatio(ratio)
+        layer.fill(Qt.transparent)
+
+        painter = QPainter(layer)
+        painter.setRenderHint(QPainter.Antialiasing)
+        pen = QPen(self.outline_color)
+        pen.setWidthF(self.outline_width + 0.6)
+        pen.setJoinStyle(Qt.RoundJoin)
 
+        shimmer_lines = []
+        shimmer_rect = QRect()
+        for i, path in self._visible_lines():
             # 描邊（黑色）
-            pen = QPen(self.outline_color)
-            pen.setWidthF(self.outline_width + 0.6)
-            pen.setJoinStyle(Qt.RoundJoin)
             painter.setPen(pen)
             painter.setBrush(Qt.NoBrush)
             painter.drawPath(path)
-
-            # 依模式繪製內部文字
-            mode = self.modes[i]
-            if mode == "solid":
+            if self.modes[i] == "solid":
                 painter.setPen(Qt.NoPen)
                 painter.setBrush(QBrush(self.solid_colors[i]))
                 painter.drawPath(path)
-            elif mode == "gradient_shimmer":
-                grad = QLinearGradient(rect.left(), 0, rect.right(), 0)
-                p = (self.phase + i * 0.08) % 1.0  # 每行動畫相位偏移
-                c0, c1 = self.gradient_colors[i][0], self.gradient_colors[i][1]
-                grad.setColorAt((p - 0.15) % 1.0, c0)
-                grad.setColorAt(p, c1)
-                grad.setColorAt((p + 0.15) % 1.0, c0)
-                painter.setPen(Qt.NoPen)
-                painter.setBrush(QBrush(grad))
-                painter.drawPath(path)
-            elif mode == "two_color_shimmer":
-                grad = QLinearGradient(rect.left(), 0, rect.right(), 0)
-                p = (self.phase + i * 0.06) % 1.0
-                c1, c2 = self.gradient_colors[i][0], self.gradient_colors[i][1]
-                grad.setColorAt((p - 0.12) % 1.0, c1)
-                grad.setColorAt(p, c2)
-                grad.setColorAt((p + 0.12) % 1.0, c1)
-                painter.setPen(Qt.NoPen)
-                painter.setBrush(QBrush(grad))
+            elif self.modes[i] in ("gradient_shimmer", "two_color_shimmer"):
+                shimmer_lines.append((i, path))
+                shimmer_rect = shimmer_rect.united(path.boundingRect().toAlignedRect().adjusted(-2, -2, 2, 2))
+        painter.end()
+
+        self._layer = layer
+        self._shimmer_lines = shimmer_lines
+        self._shimmer_rect = shimmer_rect
+
+    def _gradient(self, i, rect):
+        """每行重複使用同一個 QLinearGradient，只更新色標"""
+        grad = self._gradients.get(i)
+        if grad is None:
+            grad = self._gradients[i] = QLinearGradient(rect.left(), 0, rect.right(), 0)
+        if self.modes[i] == "gradient_shimmer":
+            p = (self.phase + i * 0.08) % 1.0  # 每行動畫相位偏移
+            spread = 0.15
+        else:  # two_color_shimmer
+            p = (self.phase + i * 0.06) % 1.0
+            spread = 0.12
+        c0, c1 = self.gradient_colors[i][0], self.gradient_colors[i][1]
+        grad.setStops(sorted([((p - spread) % 1.0, c0), (p, c1), ((p + spread) % 1.0, c0)], key=lambda s: s[0]))
+        return grad
+
+    def paintEvent(self, event):
+        paint_start = time.perf_counter()
+        if self._layer is None:
+            self._build_layer()
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._layer)
+
+        # 只有流光的填色每一格重畫
+        if self._shimmer_lines:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            rect = self.contentsRect()
+            for i, path in self._shimmer_lines:
+                painter.setBrush(QBrush(self._gradient(i, rect)))
                 painter.drawPath(path)
 
-            # 下一行 baseline（加上行距）
-            y += line_height + self.line_gap
+        painter.end()
+        profiler.record("paint", (time.perf_counter() - paint_start) * 1000)
 
     def sizeHint(self):
         """告訴佈局管理器理想高度"""
@@ -183,16 +248,32 @@ class MultiLineOutlined(QWidget):
         return QSize(self.width(), max(h, 10))
 
 
+# ---------------------------------------
+# 背景執行緒 → GUI 執行緒的訊號橋接
+# ---------------------------------------
+class SampleBridge(QObject):
+    """工作執行緒 emit，Qt 自動以 queued connection 轉到 GUI 執行緒"""
+    samples_ready = Signal()
+    warmed_up = Signal()  # 背景暖機完成
+
+
 # ---------------------------------------
 # 主視窗
 # ---------------------------------------
 class ExpApp(QWidget):
-    def __init__(self):
+    def __init__(self, map_name="", passive_meso=False, profile_overlay=False, cpu_budget=0.05,
+                 startup_profile=False, ocr_workers=0):
         super().__init__()
+        self.map_name = map_name  # 寫入 session 紀錄，供 analyze.py 依地圖分組
+        self.profile_overlay = profile_overlay  # 是否多顯示一行各階段耗時
+        self.passive_meso = passive_meso
+        self.cpu_budget = cpu_budget
+        self.ocr_workers = ocr_workers  # >0 時使用 OCR 工作行程池
+        self.startup_profile = startup_profile  # 暖機完成後印出啟動時間軸
 
         # 視窗基礎設定
         self.setWindowTitle("楓之谷經驗計算器")
-        self.resize(400, 220)
+        self.resize(400, 250 if profile_overlay else 220)
         self.setWindowFlag(Qt.WindowStaysOnTopHint)  # 永遠在最前
         self.setWindowFlag(Qt.FramelessWindowHint)   # 無邊框
         self.setAttribute(Qt.WA_TranslucentBackground)  # 背景透明，方便畫圓角
@@ -201,6 +282,7 @@ class ExpApp(QWidget):
         # 載入背景圖（存在才載入）
         self.bg_pix = QPixmap(str(ASSETS_DIR / "maple_background.png")) if (ASSETS_DIR / "maple_background.png").exists() else None
         self.bg_opacity = 0.45  # 背景透明度
+        self._bg_cache = None  # 合成好的背景（依視窗大小）
 
         # 拖曳用變數
         self._drag_pos = None
@@ -211,6 +293,9 @@ class ExpApp(QWidget):
         self.btn_quit = QPushButton("結束程式")
         for b in [self.btn_start, self.btn_login, self.btn_quit]:
             b.setFixedHeight(30)
+        # 暖機完成前不能開始計算 / 登入
+        self.btn_start.setEnabled(False)
+        self.btn_login.setEnabled(False)
 
         self.btn_start.clicked.connect(self.toggle_tracking)
         self.btn_login.clicked.connect(self.toggle_login)
@@ -222,7 +307,7 @@ class ExpApp(QWidget):
         btn_layout.addWidget(self.btn_quit)
 
         # 建立多行描邊文字元件，取代原本 4 個獨立 Label
-        self.multi_label = MultiLineOutlined(lines=4, parent=self, line_gap=12)
+        self.multi_label = MultiLineOutlined(lines=5 if profile_overlay else 4, parent=self, line_gap=12)
         font = QFont("Arial", 12, QFont.Bold)
         self.multi_label.setFont(font)
         self.multi_label.set_outline(QColor(0, 0, 0), 1.0)
@@ -235,36 +320,84 @@ class ExpApp(QWidget):
         self.setLayout(layout)
 
 
-        # 建立邏輯物件
-        self.tracker = ExpTracker()
-        self.meso_tracker = MesoTracker()
-        self.login_ctrl = LoginChannelController()
+        # 邏輯物件在背景暖機完成後才建立（_on_warmed_up）
+        self.tracker = None
+        self.meso_tracker = None
+        self.login_ctrl = None
+        self.worker = None
         self.login_running = False
         self.running = False
+        self.session = None  # 目前 session 的紀錄檔
 
-        # timer：每10秒更新經驗
-        self.exp_timer = QTimer(self)
-        self.exp_timer.setInterval(10000)
-        self.exp_timer.timeout.connect(self.update_exp)
+        self.bridge = SampleBridge(self)
+        self.bridge.samples_ready.connect(self.update_exp)
+        self.bridge.warmed_up.connect(self._on_warmed_up)
+
+        # 先顯示預留文字，視窗不必等 OCR
+        self.refresh_display()
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    # 背景暖機：匯入重量級模組、解碼模板、初始化 OCR、先找一次經驗條位置（工作執行緒）
+    def _warm_up(self):
+        try:
+            with startup.stage("匯入模組"):
+                import exp
+                import loging  # noqa: F401  註冊登入按鈕模板
+                import pipeline  # noqa: F401
+                import session_log  # noqa: F401
+            with startup.stage("解碼模板"):
+                from detector import detector
+                from templates import get_template
+                for target in list(detector.targets.values()):
+                    get_template(target.path)
+            with startup.stage("OCR 初始化"):
+                exp.warm_up_ocr()
+            with startup.stage("第一次定位經驗條"):
+                exp.exp_locator.locate()
+        except Exception as e:
+            print("暖機錯誤:", e)
+        self.bridge.warmed_up.emit()
 
-        # timer：每10分鐘更新估算
-        self.estimate_timer = QTimer(self)
-        self.estimate_timer.setInterval(600000)
-        self.estimate_timer.timeout.connect(self.update_estimate)
+    # 暖機完成（GUI 執行緒）：建立追蹤物件並啟動背景擷取
+    def _on_warmed_up(self):
+        from exp import ExpTracker
+        from loging import LoginChannelController
+        from meso import MesoTracker
+        from pipeline import AcquisitionWorker, SampleScheduler
+        from ocr_pool import OcrPool
 
-        # timer：每1分鐘更新金幣
-        self.meso_timer = QTimer(self)
-        self.meso_timer.setInterval(60000)
-        self.meso_timer.timeout.connect(self.meso_tracker.update)
+        self.tracker = ExpTracker()
+        self.meso_tracker = MesoTracker()
+        self.login_ctrl = LoginChannelController()
 
-        # 啟動時更新一次畫面
-        self.update_exp()
-        self.update_estimate()
+        # 背景擷取：經驗在變時約每2秒一次、不動時逐步放慢（最長1分鐘），錢包開著時順便讀金幣
+        # （否則最快每1分鐘主動開一次），結果經由 queue + Signal 送回，估算隨每筆樣本更新
+        self.worker = AcquisitionWorker(
+            on_sample=lambda _sample: self.bridge.samples_ready.emit(),
+            scheduler=SampleScheduler(cpu_budget=self.cpu_budget),
+            meso_interval=60.0,
+            meso_active_fallback=not self.passive_meso,
+            ocr_pool=OcrPool(self.ocr_workers) if self.ocr_workers > 0 else None,
+        )
+        self.worker.start()
+        self.worker.request_once()  # 經驗值由背景執行緒讀取後再刷新
+
+        self.btn_start.setEnabled(True)
+        self.btn_login.setEnabled(True)
+        startup.mark("可以開始計算")
+        if self.startup_profile:
+            print(startup.report())
         self.refresh_display()
 
     # 繪製半透明背景與圓角，並疊上背景圖
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def _build_background(self):
+        """依目前視窗大小把圓角底色與縮放後的背景圖合成成一張 QPixmap（只在大小改變時重建）"""
+        ratio = self.devicePixelRatioF()
+        bg = QPixmap(max(1, int(self.width() * ratio)), max(1, int(self.height() * ratio)))
+        bg.setDevicePixelRatio(ratio)
+        bg.fill(Qt.transparent)
+
+        painter = QPainter(bg)
         painter.setRenderHint(QPainter.Antialiasing)
 
         rect = self.rect()
@@ -278,12 +411,28 @@ class ExpApp(QWidget):
 
         # 若有背景圖，縮放並以半透明方式疊上
         if self.bg_pix and not self.bg_pix.isNull():
-            scaled = self.bg_pix.scaled(self.width(), self.height(), Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+            scaled = self.bg_pix.scaled(int(self.width() * ratio), int(self.height() * ratio),
+                                        Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+            scaled.setDevicePixelRatio(ratio)
             painter.setOpacity(self.bg_opacity)
-            x = (self.width() - scaled.width()) // 2
-            y = (self.height() - scaled.height()) // 2
-            painter.drawPixmap(x, y, scaled)
-            painter.setOpacity(1.0)
+            x = (self.width() - scaled.width() / ratio) / 2
+            y = (self.height() - scaled.height() / ratio) / 2
+            painter.drawPixmap(QPointF(x, y), scaled)
+        painter.end()
+        self._bg_cache = bg
+
+    def resizeEvent(self, event):
+        self._bg_cache = None
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        paint_start = time.perf_counter()
+        if self._bg_cache is None:
+            self._build_background()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._bg_cache)
+        painter.end()
+        profiler.record("background", (time.perf_counter() - paint_start) * 1000)
 
     # 視窗拖曳邏輯，點擊非按鈕區域拖動視窗
     def mousePressEvent(self, event):
@@ -311,9 +460,9 @@ class ExpApp(QWidget):
         if not self.running:
             self.tracker.reset()
             self.meso_tracker.start()
-            self.exp_timer.start()
-            self.estimate_timer.start()
-            self.meso_timer.start()
+            self.start_session()
+            self.worker.drain()  # 丟掉重新計算前的舊資料
+            self.worker.restart()  # 排程與合理性檢查都從頭開始，立刻取樣
             self.running = True
             self.btn_start.setText("重新計算")
 
@@ -321,10 +470,9 @@ class ExpApp(QWidget):
                 self.login_ctrl.stop()
                 self.login_running = False
         else:
-            self.exp_timer.stop()
-            self.estimate_timer.stop()
-            self.meso_timer.stop()
+            self.worker.set_active(False)
             self.meso_tracker.stop()
+            self.end_session()
             self.running = False
             # 重新開始（清空資料）
             self.toggle_tracking()
@@ -342,41 +490,70 @@ class ExpApp(QWidget):
             self.btn_login.setText("登入頻道")
         self.refresh_display()
 
-    # 每10秒更新經驗數據（透過截圖與OCR）
+    # 收到背景執行緒的 Sample 後更新經驗/金幣數據（GUI 執行緒）
     def update_exp(self):
+        samples = self.worker.drain()
         if self.login_running:
             self.refresh_display()
             return
-        try:
-            img = capture_exp_bar()
-            exp, percent = read_exp_and_percent(img)
-            if exp is not None and percent is not None:
-                self.tracker.update(exp, percent)
-        except Exception as e:
-            print("EXP 擷取錯誤:", e)
+        for sample in samples:
+            if sample.exp is not None and sample.percent is not None:
+                with profiler.stage("tracker"):
+                    self.tracker.update(sample.exp, sample.percent, now=sample.timestamp)
+            if sample.meso is not None:
+                self.meso_tracker.record(sample.meso, now=sample.timestamp)  # 與經驗紀錄同樣用截圖時間
 
         # 超過停滯時間自動暫停
         if self.tracker.is_stopped() and self.running:
             print("🔁 超過停滯時間，自動暫停")
-            self.exp_timer.stop()
-            self.estimate_timer.stop()
-            self.meso_timer.stop()
+            self.worker.set_active(False)
             self.meso_tracker.stop()
+            self.end_session()
             self.running = False
             self.btn_start.setText("開始計算")
 
         self.refresh_display()
 
-    # 每10分鐘更新升級估算
-    def update_estimate(self):
+    # 開始新的 session 紀錄檔，樣本由 tracker 直接寫入
+    def start_session(self):
+        from session_log import SessionWriter
+
+        self.end_session()
         try:
-            self.tracker.update_estimate()
-        except Exception as e:
-            print("估算更新錯誤:", e)
-        self.refresh_display()
+            self.session = SessionWriter(metadata={"map": self.map_name})
+        except OSError as e:
+            print("無法建立 session 紀錄:", e)
+            self.session = None
+        self.tracker.recorder = self.session
+        self.meso_tracker.recorder = self.session
+
+    # 結束 session，寫入摘要（最佳紀錄等不再只存在記憶體）
+    def end_session(self):
+        if self.session is None:
+            return
+        t = self.tracker
+        _, meso_gained = self.meso_tracker.get_meso_info()
+        self.session.close(summary={
+            "gained_exp": int(t.gained_exp),
+            "gained_percent": float(t.gained_percent),
+            "levels_gained": t.levels_gained,
+            "best_exp_gain": int(t.best_exp_gain),
+            "best_time": t.best_time,
+            "meso_gained": int(meso_gained),
+            "runtime": t.runtime(),
+        })
+        self.tracker.recorder = None
+        self.meso_tracker.recorder = None
+        self.session = None
 
     # 更新顯示文字與樣式（傳入多行文字及多行樣式）
     def refresh_display(self):
+        if self.tracker is None:
+            # 暖機中：先顯示預留文字
+            self._show_lines(["起始: --", "累積: --", "🎉 最快紀錄: --", "⏱️ 載入中…"])
+            return
+        from exp import cute_evaluation, format_time
+
         t = self.tracker
         m = self.meso_tracker
 
@@ -402,24 +579,35 @@ class ExpApp(QWidget):
         txt2 = f"🎉 最快紀錄: {best_gain:,} EXP/10分鐘   ⚙️ 運作: {format_time(t.runtime())}"
         txt3 = f"⏱️ 剩多久升級: {format_time(t.estimated_time)}    {eval_text}"
 
-        # 設定多行文字內容
-        self.multi_label.set_lines([txt0, txt1, txt2, txt3])
+        self._show_lines([txt0, txt1, txt2, txt3])
+
+    def _show_lines(self, lines):
+        # 設定多行文字內容（效能統計行為選用）
+        if self.profile_overlay:
+            lines.append(profiler.overlay_line())
+        self.multi_label.set_lines(lines)
 
         # 設定多行文字樣式
         self.multi_label.set_line_style(0, mode="solid", solid_color=QColor(150, 230, 170))  # 淡綠
         self.multi_label.set_line_style(1, mode="solid", solid_color=QColor(130, 220, 140))  # 淡綠
         self.multi_label.set_line_style(2, mode="gradient_shimmer", gradient_colors=[QColor(200, 150, 0), QColor(255, 230, 120)])  # 金色流光
         self.multi_label.set_line_style(3, mode="two_color_shimmer", gradient_colors=[QColor(60, 140, 255), QColor(240, 250, 255)])  # 藍白流光
+        if self.profile_overlay:
+            self.multi_label.set_line_style(4, mode="solid", solid_color=QColor(200, 200, 200))  # 灰
 
 
 
     # 視窗關閉前釋放資源
     def closeEvent(self, event):
-        self.exp_timer.stop()
-        self.estimate_timer.stop()
-        self.meso_timer.stop()
-        self.meso_tracker.stop()
-        self.login_ctrl.stop()
+        if self.worker is not None:  # 暖機完成前關閉時還沒有這些物件
+            self.worker.stop()
+            self.meso_tracker.stop()
+            self.end_session()
+            self.login_ctrl.stop()
+        try:
+            profiler.dump("profile.json")  # 各階段耗時分佈
+        except OSError as e:
+            print("效能統計輸出失敗:", e)
         event.accept()
 
 
@@ -427,8 +615,20 @@ class ExpApp(QWidget):
 # 主程式入口
 # ---------------------------------------
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    w = ExpApp()
+    parser = argparse.ArgumentParser(description="楓之谷經驗計算器")
+    parser.add_argument("--map", default="", help="目前練功的地圖名稱（記錄在 session 中）")
+    parser.add_argument("--passive-meso", action="store_true", help="只在背包已開啟時讀金幣，不自動按 i")
+    parser.add_argument("--profile-overlay", action="store_true", help="在視窗多顯示一行各階段耗時")
+    parser.add_argument("--cpu-budget", type=float, default=0.05, help="取樣最多使用一顆 CPU 核心的比例（預設 0.05）")
+    parser.add_argument("--startup-profile", action="store_true", help="印出啟動各階段耗時")
+    parser.add_argument("--ocr-workers", type=int, default=0, help="OCR 工作行程數（0 表示不使用行程池）")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    startup.mark("QApplication 建立")
+    w = ExpApp(map_name=args.map, passive_meso=args.passive_meso, profile_overlay=args.profile_overlay,
+               cpu_budget=args.cpu_budget, startup_profile=args.startup_profile, ocr_workers=args.ocr_workers)
     w.show()
+    startup.mark("視窗顯示")
     sys.exit(app.exec())
 
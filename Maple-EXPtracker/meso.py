@@ -1,34 +1,35 @@
 # meso.py
-import cv2
-import numpy as np
-import pytesseract
-import pyautogui
 import time
 from datetime import datetime
-from PIL import ImageGrab
-import re
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+from calibration import scaled
+from capture import get_capture
+from exp import AnchorLocator, ocr_confidence, read_meso_amount  # 與 exp.py 共用同一套 OCR（含字模辨識）
+from validation import MesoValidator
+
 class MesoTracker:
     def __init__(self):
         self.start_meso = None
         self.current_meso = None
         self.running = False
+        self.recorder = None  # session_log.SessionWriter
 
     def start(self):
+        # 第一次讀取交給背景工作執行緒，避免在 GUI 執行緒按鍵 + sleep
         self.running = True
-        self.update()
 
     def stop(self):
         self.running = False
 
-    def update(self):
-        if not self.running:
+    def record(self, meso, now=None):
+        """記錄一筆已讀到的金幣數（由背景工作執行緒讀取後交給 GUI）"""
+        if not self.running or meso is None:
             return
-        meso = open_and_read_wallet()
-        if meso is not None:
-            if self.start_meso is None:
-                self.start_meso = meso
-            self.current_meso = meso
+        if self.start_meso is None:
+            self.start_meso = meso
+        self.current_meso = meso
+        if self.recorder is not None:
+            self.recorder.record_meso(time.time() if now is None else now, meso, meso - self.start_meso)
 
     def get_meso_info(self):
         if self.start_meso is None or self.current_meso is None:
@@ -36,45 +37,134 @@ class MesoTracker:
         return (self.current_meso, self.current_meso - self.start_meso)
 
 
-def read_meso_amount(img) -> int | None:
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
-    config = "--psm 7 -c tessedit_char_whitelist=0123456789,"
-    text = pytesseract.image_to_string(thresh, config=config).strip()
-    match = re.search(r"[\d,]+", text)
-    if not match:
-        return None
-    return int(match.group().replace(",", ""))
+def wallet_digits_region(pos, s, height) -> tuple:
+    """金幣數字在錢包圖標左方 400 像素內（2560x1440 下），height 為縮放後圖標高度"""
+    x, y = pos
+    roi_left = max(x - scaled(400, s), 0)
+    return roi_left, y, x - scaled(5, s) - roi_left, height
 
 
-def open_and_read_wallet(template_path="assets/GASH.png"):
-    pyautogui.press('i')
-    time.sleep(0.8)
+class WalletReader:
+    """
+    錢包讀取：
+     - 被動模式：背包已經開著時（上次錢包位置附近找得到 GASH.png），直接讀，不按鍵
+     - 被動讀不到且距離上次嘗試超過 interval 時，先整張找一次錢包（背包開著但還沒有快取位置），
+       仍找不到才進入主動模式：按 i 開關背包
+       金幣沒變或讀取失敗時 interval 加倍（最多 max_interval），有變化就回到 min_interval
+    """
 
-    screenshot = ImageGrab.grab()
-    screen_np = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+    def __init__(self, template_path="assets/GASH.png", active_fallback=True,
+                 min_interval=60.0, max_interval=600.0):
+        self.locator = AnchorLocator(template_path, confidence=0.75, margin=24)
+        self.active_fallback = active_fallback
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.last_read = 0.0      # 上次成功讀到金幣的時間
+        self.last_meso = None
+        self.validator = MesoValidator()  # 可疑讀數趁錢包還在畫面上時重讀
+        self.passive_reads = 0
+        self.active_reads = 0
+        self.keypresses = 0
 
-    template = cv2.imread(template_path)
-    if template is None:
-        print("❌ 無法載入 GASH.png")
-        return None
+    def roi_image(self, pos):
+        """由錢包圖標位置推出金幣數字的區域並截取（灰階）"""
+        region = wallet_digits_region(pos, self.locator.scale, self.locator.template.shape[0])
+        return get_capture().grab_gray(region, tag="meso")
+
+    def _read_at(self, pos, reread=False):
+        return read_meso_amount(self.roi_image(pos), reread=reread)
+
+    def _checked(self, pos, now, meso=None):
+        """讀取（或使用已辨識好的 meso）並做合理性檢查，可疑時只重讀金幣數字那一塊"""
+        if meso is None:
+            meso = self._read_at(pos)
+        return self.validator.validate(meso, ocr_confidence["meso"], now,
+                                       reread=lambda: self._read_at(pos, reread=True))
+
+    def _press_inventory(self):
+        import pyautogui  # 需要桌面環境，只在真的要按鍵時才載入（方便無螢幕環境跑 bench）
+        pyautogui.press('i')
+        self.keypresses += 1
 
-    result = cv2.matchTemplate(screen_np, template, cv2.TM_CCOEFF_NORMED)
-    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    def passive_position(self):
+        """背包已開啟時回傳錢包圖標位置（小範圍比對，不按鍵），否則 None"""
+        return self.locator.locate(allow_full=False)
 
-    if max_val < 0.75:
-        print("⚠️ 未找到錢包圖標")
-        pyautogui.press('i')  # 關掉錢包
+    def read_passive(self, now=None, pos=None, meso=None):
+        """
+        只在背包已開啟時讀取（小範圍比對，不按鍵、不 sleep）。
+        pos / meso 可由呼叫端先取得（例如交給 OCR 池與經驗條一起辨識）
+        """
+        if pos is None:
+            pos = self.passive_position()
+            if pos is None:
+                return None
+        meso = self._checked(pos, time.time() if now is None else now, meso)
+        if meso is not None:
+            self.passive_reads += 1
+        return meso
+
+    def read_on_screen(self, now=None):
+        """在目前畫面上找錢包並讀取（必要時整張搜尋，不按鍵）"""
+        pos = self.locator.locate()
+        if pos is None:
+            return None
+        return self._checked(pos, time.time() if now is None else now)
+
+    def read_active(self, now=None):
+        """按 i 打開背包讀取後再關上"""
+        self._press_inventory()
+        time.sleep(0.8)
+        try:
+            get_capture().next_frame()
+            meso = self.read_on_screen(now)
+            if self.locator.last_pos is None:
+                print("⚠️ 未找到錢包圖標")
+            if meso is not None:
+                self.active_reads += 1
+            return meso
+        finally:
+            self._press_inventory()  # 關掉錢包
+
+    def _accept(self, meso, now):
+        # 主動讀取的間隔依金幣是否變化自動調整
+        if meso == self.last_meso:
+            self.interval = min(self.interval * 2, self.max_interval)
+        else:
+            self.interval = self.min_interval
+        self.last_meso = meso
+        self.last_read = now
+        return meso
+
+    def poll(self, now=None, pos=None, meso=None):
+        """每次取樣時呼叫：先被動讀，必要時才主動開背包（pos / meso 同 read_passive）"""
+        now = time.time() if now is None else now
+        meso = self.read_passive(now, pos, meso)
+        if meso is not None:
+            return self._accept(meso, now)
+        if now - self.last_read < self.interval:
+            return None
+        meso = self.read_on_screen(now)  # 背包可能本來就開著，按 i 反而會把它關掉
+        if meso is not None:
+            self.passive_reads += 1
+        elif self.active_fallback:
+            meso = self.read_active(now)
+        if meso is not None:
+            return self._accept(meso, now)
+        # 讀取失敗也拉長間隔再試，避免一直整張搜尋或按鍵
+        self.last_read = now
+        self.interval = min(self.interval * 2, self.max_interval)
         return None
 
-    x, y = max_loc
-    roi_left = max(x - 400, 0)
-    roi_top = y
-    roi_right = x - 5
-    roi_bottom = y + template.shape[0]
-    meso_img = screen_np[roi_top:roi_bottom, roi_left:roi_right]
+    def stats(self) -> dict:
+        return {
+            "passive_reads": self.passive_reads,
+            "active_reads": self.active_reads,
+            "keypresses": self.keypresses,
+            "interval": self.interval,
+            "validation": self.validator.stats(),
+        }
 
-    meso = read_meso_amount(meso_img)
 
-    pyautogui.press('i')  # 關掉錢包
-    return meso
+wallet_reader = WalletReader()
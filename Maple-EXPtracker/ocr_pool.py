@@ -0,0 +1,126 @@
+# ocr_pool.py
+# OCR 工作行程池：同一張畫面截下的多塊區域（經驗條、金幣、之後的藥水數量……）一次送出，在多顆核心上平行辨識
+#
+# - 工作行程常駐，啟動時各自載入一次字模；有安裝 tesserocr 時各自常駐一個 Tesseract 引擎，
+#   沒有時退回 pytesseract（每次呼叫仍會啟動 tesseract 執行檔）
+# - 二值化與 ChangeGate 在呼叫端做：字串圖沒變的區域不送進池子，直接回傳已完成的 Future
+# - 只有主行程學習、存檔字模：工作行程用 Tesseract 讀出的文字回到主行程學習，
+#   每個工作請求都附上主行程目前的字模（含版本號），工作行程版本不同時換上，之後就能用字模辨識
+# - 只送區域種類名稱與二值化影像；種類必須定義在 exp.OCR_KINDS（工作行程匯入 exp 時就有）
+#
+
+import os
+import re
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from exp import OCR_KINDS, binarize, digit_reader, ocr_confidence, ocr_gate, ocr_text, parse_text, warm_up_ocr
+from profiling import child_cpu_time, profiler
+
+
+# ---------- 工作行程端 ----------
+_api = None  # 有安裝 tesserocr 時，每個工作行程常駐一個 Tesseract 引擎，不必每次呼叫都開新行程
+
+
+def _init_worker():
+    global _api
+    digit_reader.version = -1  # 匯入時從檔案載入的字模不一定是主行程目前的，第一個請求一定同步
+    try:
+        import tesserocr
+        _api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SINGLE_LINE)
+    except Exception:
+        _api = None
+        warm_up_ocr()  # 退回 pytesseract，先確認執行檔可用
+
+
+def _tesseract_api(thresh, config):
+    """用常駐引擎辨識；config 中的白名單改用 SetVariable 設定"""
+    whitelist = re.search(r"tessedit_char_whitelist=(\S+)", config)
+    _api.SetVariable("tessedit_char_whitelist", whitelist.group(1) if whitelist else "")
+    h, w = thresh.shape[:2]
+    _api.SetImageBytes(thresh.tobytes(), w, h, 1, w)
+    return _api.GetUTF8Text()
+
+
+def _recognize(kind, thresh, tesseract_only, glyphs):
+    """回傳 (文字, 信心, 這次辨識用掉的 CPU 秒數)；CPU 含這個行程與它開的 tesseract 子程序"""
+    start = time.process_time() + child_cpu_time()
+    if glyphs[0] != digit_reader.version:
+        digit_reader.restore(glyphs)
+    try:
+        if _api is not None:
+            text, conf = ocr_text(kind, thresh, tesseract_only, tesseract=_tesseract_api, learn=False)
+        else:
+            text, conf = ocr_text(kind, thresh, tesseract_only, learn=False)
+        return text, conf, time.process_time() + child_cpu_time() - start
+    except Exception as e:
+        # 有些例外（例如 TesseractNotFoundError）無法在主行程還原，整個池子會被判定損壞，改成一般例外回傳
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+# ---------- 主行程端 ----------
+RESULT_TIMEOUT = 5.0  # 等工作行程結果的上限（秒）；逾時（例如 Tesseract 卡住）時呼叫端改在自己的執行緒辨識
+
+
+class OcrPool:
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = max(1, min(len(OCR_KINDS), (os.cpu_count() or 2) - 1))  # 留一顆核心給遊戲
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self.submitted = 0
+        self.skipped = 0
+        self.cpu_seconds = 0.0  # 工作行程回報的累計辨識 CPU 秒數（取樣排程的 CPU 預算用）
+
+    def submit(self, kind, img, reread=False, key=None) -> Future:
+        """送出一塊區域，Future 的結果與 exp.read_region(kind, img, reread, key) 相同"""
+        key = key or kind
+        out = Future()
+        if img is None:
+            out.set_result(OCR_KINDS[kind].empty)
+            return out
+
+        thresh = binarize(kind, img)
+        sig = ocr_gate.signature(thresh)
+        if not reread:
+            same, result = ocr_gate.lookup(key, sig)
+            if same:
+                profiler.count("ocr_skipped")
+                self.skipped += 1
+                out.set_result(result)
+                return out
+
+        self.submitted += 1
+        start = time.perf_counter()
+        future = self._executor.submit(_recognize, kind, thresh, reread, digit_reader.snapshot())
+
+        def _done(f):
+            # 回呼裡的例外不會傳到任何地方，一定要交給 out，否則等結果的一方會一直等下去
+            try:
+                text, conf, cpu = f.result()
+                profiler.record("ocr_pool", (time.perf_counter() - start) * 1000)
+                self.cpu_seconds += cpu
+                if text is not None and conf is None:
+                    digit_reader.learn(thresh, re.sub(r"\s+", "", text))  # 工作行程用 Tesseract 讀出，主行程學字模
+                elif text is None:
+                    profiler.count("ocr_fail")
+                ocr_confidence[key] = conf
+                result = parse_text(kind, text)
+                ocr_gate.store(key, sig, result)
+            except Exception as e:
+                out.set_exception(e)
+                return
+            out.set_result(result)
+
+        future.add_done_callback(_done)
+        return out
+
+    def submit_batch(self, regions) -> dict:
+        """
+        regions: {名稱: (kind, 影像)}，回傳 {名稱: Future}；全部先送出再等，彼此平行。
+        名稱同時當作快取鍵（例如多開時的 "client1:exp"）
+        """
+        return {name: self.submit(kind, img, key=name) for name, (kind, img) in regions.items()}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
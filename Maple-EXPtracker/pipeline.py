@@ -0,0 +1,271 @@
+# pipeline.py
+# 背景擷取工作執行緒：截圖、模板比對、OCR 都在這裡做，不佔用 Qt 的 GUI 執行緒
+#
+# - 工作執行緒讀取經驗條，並順便（被動）讀取錢包，產生 Sample(timestamp, exp, percent, meso)
+# - 取樣間隔由 SampleScheduler 調整：經驗在變時加快，不動或看不到遊戲時指數拉長，並受 CPU 預算限制
+# - Sample 放進 queue，並透過 on_sample 回呼通知 GUI（GUI 端用 Signal 轉回主執行緒）
+# - 一次只做一件事，OCR 慢也不會讓 timer 疊在一起
+# - 有 OcrPool 時，經驗條與（已開啟的）錢包從同一張畫面截取後一起送進工作行程池平行辨識
+#
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from capture import get_capture
+from exp import capture_exp_bar, ocr_confidence, read_exp_and_percent
+from meso import WalletReader
+from ocr_pool import RESULT_TIMEOUT
+from profiling import child_cpu_time
+from validation import ExpValidator
+
+Sample = namedtuple("Sample", ["timestamp", "exp", "percent", "meso"])
+
+
+def sampling_cpu_time(ocr_pool=None) -> float:
+    """取樣用掉的累計 CPU 秒數：本執行緒、已結束的 Tesseract 子程序，以及 OCR 池工作行程回報的辨識時間"""
+    total = time.thread_time() + child_cpu_time()
+    if ocr_pool is not None:
+        total += ocr_pool.cpu_seconds
+    return total
+
+
+class SampleScheduler:
+    """
+    依讀數決定下一次取樣間隔：
+     - 經驗有變化（正在打怪）→ 立刻回到 min_interval
+     - 經驗沒變 → 每次乘上 backoff，最長 idle_interval
+     - 讀不到經驗條（遊戲視窗被擋住 / 最小化）→ 同樣拉長，最長 hidden_interval
+    另外間隔不會短於「平均取樣 CPU 時間 / cpu_budget」，例如 cpu_budget=0.05 表示最多用一顆核心的 5%
+    （CPU 時間見 sampling_cpu_time：取樣執行緒 + Tesseract 子程序 + OCR 池工作行程；開背包的 sleep 不算）
+    """
+
+    def __init__(self, min_interval=2.0, idle_interval=60.0, hidden_interval=120.0, backoff=2.0,
+                 cpu_budget=0.05):
+        self.min_interval = min_interval
+        self.idle_interval = idle_interval
+        self.hidden_interval = hidden_interval
+        self.backoff = backoff
+        self.cpu_budget = cpu_budget
+        self.cost = None        # 每次取樣 CPU 時間（秒）的指數移動平均
+        self.samples = 0
+        self.changes = 0
+        self.reset()
+
+    def reset(self):
+        """開始（重新）計算時從最快的間隔開始"""
+        self.interval = self.min_interval
+
+    def budget_floor(self) -> float:
+        if not self.cost or self.cpu_budget <= 0:
+            return 0.0
+        return self.cost / self.cpu_budget
+
+    def next_interval(self, changed, visible, cost) -> float:
+        """記錄這次取樣的結果與 CPU 時間，回傳距離下一次取樣的秒數"""
+        self.cost = cost if self.cost is None else self.cost * 0.8 + cost * 0.2
+        self.samples += 1
+        if not visible:
+            self.interval = min(self.interval * self.backoff, self.hidden_interval)
+        elif changed:
+            self.changes += 1
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.idle_interval)
+        return max(self.interval, self.budget_floor())
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "cost_ms": (self.cost or 0.0) * 1000,
+            "budget_floor": self.budget_floor(),
+            "samples": self.samples,
+            "changes": self.changes,
+        }
+
+
+class AcquisitionWorker:
+    def __init__(self, on_sample=None, scheduler=None, meso_interval=60.0, max_queue=64,
+                 meso_active_fallback=True, ocr_pool=None):
+        self.on_sample = on_sample          # 有新 Sample 時呼叫（在工作執行緒中）
+        self.scheduler = scheduler or SampleScheduler()
+        self.ocr_pool = ocr_pool            # ocr_pool.OcrPool；None 表示在這個執行緒依序辨識
+        # 錢包：每次取樣都被動檢查，背包沒開時才依 meso_interval（會自動拉長）主動開背包
+        self.wallet = WalletReader(active_fallback=meso_active_fallback, min_interval=meso_interval)
+        self.validator = ExpValidator()     # OCR 讀數進 tracker 前的合理性檢查
+        self.samples = queue.Queue(maxsize=max_queue)
+
+        self.running = False
+        self.thread = None
+        self.active = False                 # 是否持續取樣
+        self.read_meso = False              # 是否讀取錢包
+        self._once = False                  # 單次取樣請求
+        self._restart = False               # 重新計算請求（見 restart()）
+        self._last_reading = None           # 上一次的 (exp, percent)，判斷經驗是否在變
+        self._wake = threading.Event()
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.ocr_pool is not None:
+            self.ocr_pool.close()
+
+    def set_active(self, active: bool, read_meso: bool = True):
+        """開始/暫停持續取樣"""
+        self.active = active
+        self.read_meso = active and read_meso
+        self._wake.set()
+
+    def restart(self, read_meso: bool = True):
+        """
+        開始或重新計算：下一輪迴圈重設排程與合理性檢查並立刻取樣。
+        連續呼叫 set_active(False) / set_active(True) 時迴圈可能沒看到暫停，什麼都不會重設，所以另外記旗標
+        """
+        self._restart = True
+        self.set_active(True, read_meso)
+
+    def request_once(self):
+        """要求立即取樣一次經驗值（不論是否 active）"""
+        self._once = True
+        self._wake.set()
+
+    def drain(self) -> list:
+        """取出目前 queue 中所有 Sample（GUI 執行緒呼叫）"""
+        items = []
+        while True:
+            try:
+                items.append(self.samples.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _publish(self, sample):
+        try:
+            self.samples.put_nowait(sample)
+        except queue.Full:
+            # 消費端跟不上時丟掉最舊的
+            try:
+                self.samples.get_nowait()
+            except queue.Empty:
+                pass
+            self.samples.put_nowait(sample)
+        if self.on_sample:
+            self.on_sample(sample)
+
+    def _submit_regions(self):
+        """把經驗條與已開啟的錢包一起送進 OCR 池，回傳 (經驗 Future, 錢包位置, 金幣 Future)"""
+        regions = {"exp": ("exp", capture_exp_bar())}
+        wallet_pos = None
+        if self.read_meso:
+            try:
+                wallet_pos = self.wallet.passive_position()
+            except Exception as e:
+                print("金幣擷取錯誤:", e)
+            if wallet_pos is not None:
+                regions["meso"] = ("meso", self.wallet.roi_image(wallet_pos))
+        futures = self.ocr_pool.submit_batch(regions)
+        return futures["exp"], wallet_pos, futures.get("meso")
+
+    def _read_exp(self, now, future=None):
+        """回傳 (exp, percent, 是否讀到經驗條)；不合理的讀數會重讀一次，仍不合理則 exp/percent 為 None"""
+        try:
+            if future is not None:
+                exp, percent = self._pool_result(future, lambda: read_exp_and_percent(capture_exp_bar()))
+            else:
+                exp, percent = read_exp_and_percent(capture_exp_bar())
+            if exp is None or percent is None:
+                return None, None, False
+            reading = self.validator.validate((exp, percent), ocr_confidence["exp"], now, reread=self._reread_exp)
+            if reading is None:
+                return None, None, True
+            return reading[0], reading[1], True
+        except Exception as e:
+            print("EXP 擷取錯誤:", e)
+            return None, None, False
+
+    @staticmethod
+    def _pool_result(future, fallback):
+        """等 OCR 池的結果；逾時（工作行程卡住）或出錯時改用 fallback 在本執行緒辨識，不讓取樣停住"""
+        try:
+            return future.result(timeout=RESULT_TIMEOUT)
+        except Exception as e:
+            print("OCR 池錯誤，改在本執行緒辨識:", type(e).__name__, e)
+            return fallback()
+
+    @staticmethod
+    def _reread_exp():
+        """只重新截取經驗條那一小塊，用 Tesseract 再讀一次"""
+        exp, percent = read_exp_and_percent(capture_exp_bar(), reread=True)
+        return None if exp is None or percent is None else (exp, percent)
+
+    def _read_meso(self, now, pos=None, future=None):
+        try:
+            if future is not None:
+                return self.wallet.poll(now, pos, self._pool_result(future, lambda: None))  # None：poll 自己重讀
+            return self.wallet.poll(now)
+        except Exception as e:
+            print("金幣擷取錯誤:", e)
+            return None
+
+    def sample(self, timestamp=None, advance=True):
+        """
+        讀取目前畫面一次（經驗 + 選用的錢包），回傳 (Sample, 建議的下次取樣間隔)。
+        _run 迴圈用它；重播時也可以直接逐張呼叫，timestamp 傳入畫面的時間，
+        advance=False 表示讀目前這張（例如重播來源剛建立時已載入的第一張）
+        """
+        start = sampling_cpu_time(self.ocr_pool)  # 只算 CPU，不含按鍵等待
+        now = time.time() if timestamp is None else timestamp
+        if advance:
+            get_capture().next_frame()  # 重播來源前進一張；即時來源不做事
+        exp_future = wallet_pos = meso_future = None
+        if self.ocr_pool is not None:
+            try:
+                exp_future, wallet_pos, meso_future = self._submit_regions()
+            except Exception as e:  # 退回依序辨識
+                print("OCR 池錯誤:", e)
+        exp, percent, visible = self._read_exp(now, exp_future)
+        # 錢包與經驗同一次取樣一起讀，背包開著就不必按鍵
+        meso = self._read_meso(now, wallet_pos, meso_future) if self.read_meso else None
+        # 讀數被 validator 丟棄時經驗條仍在畫面上，當作有變化，盡快再讀一次
+        changed = visible and (exp is None or (exp, percent) != self._last_reading)
+        if exp is not None:
+            self._last_reading = (exp, percent)
+        delay = self.scheduler.next_interval(changed, visible, sampling_cpu_time(self.ocr_pool) - start)
+        return Sample(now, exp, percent, meso), delay
+
+    def _run(self):
+        next_exp = 0.0
+        was_active = False
+        while self.running:
+            self._wake.clear()
+            if self.active and (not was_active or self._restart):
+                # 剛開始（或重新）計算，立刻取樣一次
+                self._restart = False
+                next_exp = 0.0
+                self._last_reading = None
+                self.scheduler.reset()
+                self.validator.reset()
+            was_active = self.active
+
+            now = time.time()
+            do_exp = self._once or (self.active and now >= next_exp)
+            self._once = False
+
+            if do_exp:
+                sample, delay = self.sample()
+                next_exp = time.time() + delay
+                self._publish(sample)
+
+            if not self.active:
+                self._wake.wait()
+                continue
+            self._wake.wait(timeout=max(0.0, next_exp - time.time()))
@@ -0,0 +1,185 @@
+# profiling.py
+# 常駐的輕量效能統計：記錄每個階段（截圖、比對、二值化、OCR、解析、追蹤更新、繪製）的耗時分佈
+#
+# - 每個階段一個固定大小的對數分桶直方圖（NumPy 陣列），記錄一次只是一個 bisect + 加一
+# - 另外有計數器（例如 OCR 失敗次數），以及其他模組登記的統計來源（例如 OCR 變化閘門的略過比例）
+# - 可輸出一行摘要給視窗顯示，結束時輸出 JSON
+#
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+
+import numpy as np
+
+# 分桶上界（毫秒）：0.01ms ~ 10s，對數等距
+BUCKET_EDGES_MS = np.geomspace(0.01, 10000, 61)
+_EDGES = BUCKET_EDGES_MS.tolist()
+
+# 顯示用的階段名稱
+STAGE_LABELS = {
+    "capture": "截圖",
+    "match": "比對",
+    "threshold": "二值化",
+    "ocr": "OCR",
+    "ocr_tesseract": "Tesseract",
+    "ocr_pool": "OCR池",
+    "parse": "解析",
+    "tracker": "追蹤",
+    "paint": "繪製",
+    "background": "背景",
+    "login_detect": "登入偵測",
+}
+
+
+class StageHistogram:
+    __slots__ = ("counts", "total_ms", "max_ms", "n")
+
+    def __init__(self):
+        self.counts = np.zeros(len(_EDGES) + 1, np.int64)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.n = 0
+
+    def add(self, ms):
+        self.counts[bisect_right(_EDGES, ms)] += 1
+        self.total_ms += ms
+        self.n += 1
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q) -> float:
+        """由直方圖估計百分位數（回傳該分桶的上界）"""
+        if self.n == 0:
+            return 0.0
+        rank = np.searchsorted(np.cumsum(self.counts), q / 100 * self.n)
+        if rank >= len(_EDGES):
+            return self.max_ms
+        return min(_EDGES[rank], self.max_ms)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.n,
+            "mean_ms": self.total_ms / self.n if self.n else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.sources = {}   # 名稱 -> 回傳 dict 的函式，summary() 時呼叫
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, stage, ms):
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = StageHistogram()
+            hist.add(ms)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_stats(self, name, func):
+        """登記額外的統計來源，summary()（profile.json、headless 的 end 紀錄）會一起輸出"""
+        self.sources[name] = func
+
+    def summary(self) -> dict:
+        with self._lock:
+            out = {
+                "uptime_s": time.time() - self.started,
+                "stages": {name: hist.summary() for name, hist in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+        out["stats"] = {name: func() for name, func in list(self.sources.items())}
+        return out
+
+    def overlay_line(self) -> str:
+        """一行摘要（各階段 p50），給視窗顯示用"""
+        with self._lock:
+            parts = [
+                f"{STAGE_LABELS.get(name, name)} {hist.percentile(50):.1f}ms"
+                for name, hist in self.stages.items() if hist.n
+            ]
+            fails = self.counters.get("ocr_fail", 0)
+        if fails:
+            parts.append(f"OCR失敗 {fails}")
+        gate = self.sources.get("ocr_gate")
+        if gate is not None:
+            stats = gate()
+            if stats["checks"]:
+                parts.append(f"OCR略過 {stats['skip_ratio']:.0%}")
+        return " ".join(parts)
+
+    def dump(self, path="profile.json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+
+profiler = Profiler()
+
+
+def child_cpu_time() -> float:
+    """已結束的子程序（例如 pytesseract 開的 tesseract）累計的 CPU 秒數；Windows 上 os.times 沒有這項，為 0"""
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+class StartupTimer:
+    """啟動時間軸：記錄從程式開始執行到各個里程碑 / 暖機階段的時間（--startup-profile）"""
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.events = []  # (名稱, 開始 ms, 耗時 ms)；里程碑的耗時為 None
+        self._lock = threading.Lock()
+
+    def _now_ms(self):
+        return (time.perf_counter() - self.t0) * 1000
+
+    def mark(self, name):
+        with self._lock:
+            self.events.append((name, self._now_ms(), None))
+
+    @contextmanager
+    def stage(self, name):
+        start = self._now_ms()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.events.append((name, start, self._now_ms() - start))
+
+    def report(self) -> str:
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e[1])
+        lines = ["啟動時間（自程式開始執行）："]
+        for name, start, duration in events:
+            if duration is None:
+                lines.append(f"  {start:8.1f} ms  ● {name}")
+            else:
+                lines.append(f"  {start:8.1f} ms  {name}（{duration:.1f} ms）")
+        return "\n".join(lines)
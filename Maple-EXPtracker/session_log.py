@@ -0,0 +1,133 @@
+# session_log.py
+# 每次計算一個 session，樣本以固定長度的二進位紀錄附加寫入硬碟
+#
+# - sessions/<id>.bin ：SAMPLE_DTYPE 紀錄連續排列，可直接用 numpy.memmap 開啟
+#   id 為 開始時間（到毫秒）-名稱，.bin 以獨占模式建立：同一秒開始的 session（多開、重新計算）不會共用檔案
+# - sessions/<id>.json：session 資訊（開始/結束時間、地圖、最佳紀錄等）
+# - 寫檔在背景執行緒批次進行，不佔用 GUI 執行緒
+#
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+SESSIONS_DIR = "sessions"
+FORMAT_VERSION = 1
+
+KIND_EXP = 1
+KIND_MESO = 2
+
+# 固定長度紀錄（packed，29 bytes）
+SAMPLE_DTYPE = np.dtype([
+    ("t", "<f8"),        # 時間戳（epoch 秒）
+    ("kind", "u1"),      # KIND_EXP / KIND_MESO
+    ("value", "<i8"),    # 經驗值或金幣數
+    ("percent", "<f4"),  # 經驗百分比（金幣紀錄為 NaN）
+    ("gained", "<i8"),   # 自 session 開始的累計增量
+])
+
+
+class SessionWriter:
+    def __init__(self, directory=SESSIONS_DIR, metadata=None, batch_size=32, flush_interval=5.0, name=None):
+        os.makedirs(directory, exist_ok=True)
+        start = time.time()
+        base = time.strftime("%Y%m%d-%H%M%S", time.localtime(start)) + f"-{int(start * 1000) % 1000:03d}"
+        if name:
+            base += "-" + re.sub(r"[^\w.-]", "_", name)
+        self._file = None
+        attempt = 0
+        while self._file is None:
+            self.session_id = base if attempt == 0 else f"{base}-{attempt}"
+            self.bin_path = os.path.join(directory, self.session_id + ".bin")
+            try:
+                self._file = open(self.bin_path, "xb")  # 獨占建立，撞名就換下一個 id
+            except FileExistsError:
+                attempt += 1
+        self.meta_path = os.path.join(directory, self.session_id + ".json")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.metadata = {
+            "version": FORMAT_VERSION,
+            "id": self.session_id,
+            "start": start,
+            "end": None,
+            "dtype": SAMPLE_DTYPE.descr,
+        }
+        self.metadata.update(metadata or {})
+        self._write_metadata()
+
+        self._queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # ---------- 寫入介面（任何執行緒皆可呼叫） ----------
+    def record_exp(self, t, exp, percent, gained_exp):
+        self._queue.put((t, KIND_EXP, exp, percent, gained_exp))
+
+    def record_meso(self, t, meso, gained_meso):
+        self._queue.put((t, KIND_MESO, meso, np.nan, gained_meso))
+
+    def close(self, summary=None):
+        """寫完剩下的紀錄並補上結束時間與摘要"""
+        if self.thread is None:
+            return
+        self._queue.put(None)
+        self.thread.join(timeout=5)
+        self.thread = None
+        self.metadata["end"] = time.time()
+        if summary:
+            self.metadata["summary"] = summary
+        self._write_metadata()
+
+    # ---------- 內部 ----------
+    def _write_metadata(self):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.meta_path)
+
+    def _run(self):
+        pending = []
+        with self._file as f:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = ()
+                if item:
+                    pending.append(item)
+                if pending and (item is None or item == () or len(pending) >= self.batch_size):
+                    f.write(np.array(pending, dtype=SAMPLE_DTYPE).tobytes())
+                    f.flush()
+                    pending.clear()
+                if item is None:
+                    return
+
+
+# ---------- 讀取 ----------
+def load_session(meta_path):
+    """回傳 (metadata, samples)，samples 為唯讀的 numpy.memmap（空 session 為空陣列）"""
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    bin_path = os.path.splitext(meta_path)[0] + ".bin"
+    dtype = np.dtype([tuple(d) for d in meta.get("dtype", SAMPLE_DTYPE.descr)])
+    size = os.path.getsize(bin_path) if os.path.exists(bin_path) else 0
+    count = size // dtype.itemsize
+    if count == 0:
+        return meta, np.zeros(0, dtype)
+    return meta, np.memmap(bin_path, dtype=dtype, mode="r", shape=(count,))
+
+
+def list_sessions(directory=SESSIONS_DIR) -> list:
+    """列出資料夾中所有 session 的 metadata 路徑（依時間排序）"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".json")
+    )
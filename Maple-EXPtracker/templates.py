@@ -0,0 +1,74 @@
+# templates.py
+# 全程式共用的模板快取：每張 PNG 只解碼一次
+#
+# - 同時預先算好灰階版本（偵測與校正都用灰階比對）
+# - 檔案修改時間（mtime）改變時自動重新載入；mtime 最多每 check_interval 秒檢查一次
+#
+
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class TemplateEntry:
+    __slots__ = ("path", "mtime", "color", "gray", "width", "height")
+
+    def __init__(self, path, mtime, color):
+        self.path = path
+        self.mtime = mtime
+        self.color = color
+        self.gray = cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+        self.height, self.width = color.shape[:2]
+
+
+class TemplateRegistry:
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._entries = {}
+        self._checked = {}     # path -> 上次檢查 mtime 的時間
+        self._lock = threading.Lock()
+        self.loads = 0          # 實際從硬碟解碼的次數
+
+    def get(self, path) -> TemplateEntry | None:
+        """取得模板；檔案不存在或無法解碼時回傳 None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - self._checked.get(path, 0) < self.check_interval:
+                return entry
+            self._checked[path] = now
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                self._entries.pop(path, None)
+                return None
+            if entry is not None and entry.mtime == mtime:
+                return entry
+
+            color = cv2.imread(path, cv2.IMREAD_COLOR)
+            if color is None:
+                self._entries.pop(path, None)
+                return None
+            self.loads += 1
+            entry = TemplateEntry(path, mtime, np.ascontiguousarray(color))
+            self._entries[path] = entry
+            return entry
+
+    def preload(self, paths):
+        for path in paths:
+            self.get(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._checked.clear()
+
+
+registry = TemplateRegistry()
+
+
+def get_template(path) -> TemplateEntry | None:
+    return registry.get(path)
@@ -0,0 +1,104 @@
+# tests/test_buffers.py
+# 穩定狀態下截圖與前處理不應再配置新的共用緩衝（profiler 的 buffer_alloc 計數），
+# 讀經驗條那一段（截取、二值化、簽章）也不應配置與字串圖同大小的暫存陣列（tracemalloc 峰值）
+
+import os
+import sys
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.chdir(APP_DIR)  # 模板以 assets/ 相對路徑載入
+    import exp
+    from capture import set_capture
+    from profiling import profiler
+
+    # 不跑真的 OCR（Tesseract 不一定有安裝），只量測截圖、二值化與偵測
+    monkeypatch.setattr(exp, "ocr_text", lambda kind, thresh, *args, **kwargs: (None, None))
+    yield exp, profiler
+    set_capture(None)
+
+
+def _synthetic_frame():
+    frame = np.full((720, 1280, 3), 40, np.uint8)
+    template = cv2.imread(os.path.join(APP_DIR, "assets", "EXP.png"), cv2.IMREAD_COLOR)
+    h, w = template.shape[:2]
+    frame[600:600 + h, 20:20 + w] = template
+    cv2.putText(frame, "440740[13.21%]", (100, 625), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (235, 235, 235), 2)
+    return frame
+
+
+def _tick(exp, source):
+    screen = source.grab_gray(tag="screen")
+    found = exp.detector.detect_all(screen, exp.exp_locator.name, max_hits=1)
+    region = exp.exp_bar_region((found[0].x, found[0].y), 1.0)
+    img = source.grab_gray(region, tag="exp")
+    before = img.copy()
+    exp.ocr_gate.reset()
+    exp.read_region("exp", img)
+    return img, before
+
+
+def test_steady_state_does_not_allocate(app, tmp_path):
+    exp, profiler = app
+    from capture import ReplayCapture, set_capture
+
+    path = str(tmp_path / "frame.npy")
+    np.save(path, _synthetic_frame())
+    source = ReplayCapture([path, path])
+    set_capture(source)
+
+    _tick(exp, source)  # 第一張：配置各用途的緩衝
+    warm = profiler.counters.get("buffer_alloc", 0)
+    assert warm > 0
+
+    assert source.next_frame()
+    _tick(exp, source)
+    assert profiler.counters.get("buffer_alloc", 0) == warm
+
+
+def test_steady_read_peak_memory(app, tmp_path):
+    exp, _ = app
+    from capture import ReplayCapture, set_capture
+
+    path = str(tmp_path / "frame.npy")
+    np.save(path, _synthetic_frame())
+    source = ReplayCapture([path, path])
+    set_capture(source)
+
+    img, _ = _tick(exp, source)  # 第一張：配置各用途的緩衝
+    screen = source.grab_gray(tag="screen")
+    found = exp.detector.detect_all(screen, exp.exp_locator.name, max_hits=1)
+    region = exp.exp_bar_region((found[0].x, found[0].y), 1.0)
+
+    assert source.next_frame()
+    tracemalloc.start()
+    try:
+        img = source.grab_gray(region, tag="exp")
+        exp.ocr_gate.reset()
+        exp.read_region("exp", img)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < img.nbytes // 4  # 偵測用的比對結果另計；這一段只剩雜湊與小物件
+
+
+def test_threshold_does_not_overwrite_capture(app, tmp_path):
+    exp, _ = app
+    from capture import ReplayCapture, set_capture
+
+    path = str(tmp_path / "frame.npy")
+    np.save(path, _synthetic_frame())
+    source = ReplayCapture([path])
+    set_capture(source)
+
+    img, before = _tick(exp, source)
+    assert np.array_equal(img, before)
@@ -0,0 +1,73 @@
+# tests/test_level_up.py
+# 升級 / 死亡扣經驗的判斷，以及跨等級時累計經驗與估算的連續性
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exp import ExpTracker, is_level_up  # noqa: E402
+
+
+def test_level_up_without_table():
+    t = ExpTracker(exp_table={})
+    t.update(6000, 60.0, now=0)
+    t.update(1500, 15.0, now=60)
+    assert t.levels_gained == 1
+    assert t.gained_exp == 1500 + 10000 - 6000
+    assert t.gained_percent == pytest.approx(55.0)
+
+
+def test_level_up_with_table():
+    t = ExpTracker(exp_table={10: 10000, 11: 11000})
+    t.update(6000, 60.0, now=0)
+    assert t.level == 10
+    t.update(550, 5.0, now=60)  # 550 / 5% → 11000，是下一級的所需經驗
+    assert t.levels_gained == 1
+    assert t.level == 11
+    assert t.gained_exp == 550 + 10000 - 6000
+
+
+def test_small_drop_to_next_level_requirement():
+    # 百分比只掉幾點，但推算的所需經驗換成下一級的 → 升級
+    assert is_level_up(9000, 9.0, 3300, 3.0)
+
+
+@pytest.mark.parametrize("before, after", [
+    ((6000, 60.0), (5400, 54.0)),  # 高百分比時死亡
+    ((300, 3.0), (200, 2.0)),      # 低百分比時死亡
+])
+def test_death_penalty_is_not_level_up(before, after):
+    assert not is_level_up(*before, *after)
+    t = ExpTracker(exp_table={})
+    t.update(*before, now=0)
+    t.update(*after, now=60)
+    assert t.levels_gained == 0
+    assert t.gained_exp == after[0] - before[0]
+
+
+def test_death_penalty_with_table():
+    assert not is_level_up(6000, 60.0, 5400, 54.0, need=10000, next_need=11000)
+
+
+def test_misread_without_percent_drop_is_not_level_up():
+    assert not is_level_up(440740, 13.21, 44074, 13.21)
+
+
+def test_gain_and_estimate_continuous_across_rollover():
+    # 每分鐘 +1%（升級所需 10000），從 95.5% 跨過升級
+    t = ExpTracker(exp_table={})
+    exp, gains, rates = 9550, [], []
+    for minute in range(10):
+        t.update(exp % 10000, (exp % 10000) / 100, now=minute * 60)
+        gains.append(t.gained_exp)
+        rates.append(t.percent_per_10min)
+        exp += 100
+    assert t.levels_gained == 1
+    assert all(b - a == 100 for a, b in zip(gains, gains[1:]))
+    assert rates[-1] == pytest.approx(10.0)
+    assert rates[5] == pytest.approx(rates[4])  # 升級前後速度不跳動
+    # 估算的剩餘時間以新等級的百分比計算
+    assert t.estimated_time == pytest.approx((100 - t.last_percent) * 60, abs=1)
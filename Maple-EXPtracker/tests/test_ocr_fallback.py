@@ -0,0 +1,51 @@
+# tests/test_ocr_fallback.py
+# OCR 的備援路徑：字模存檔失敗不影響學習結果、OCR 池逾時或出錯時改在本執行緒辨識
+
+import os
+import sys
+from concurrent.futures import Future
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline  # noqa: E402
+from digit_ocr import DigitRecognizer  # noqa: E402
+
+
+def two_glyphs():
+    """白底黑字的兩個字元：一條直線與一個方塊"""
+    img = np.full((20, 30), 255, np.uint8)
+    img[3:17, 6:8] = 0
+    img[3:17, 16:24] = 0
+    return img
+
+
+def test_learn_keeps_glyphs_when_save_fails(tmp_path):
+    reader = DigitRecognizer(path=str(tmp_path / "missing_dir" / "glyphs.npz"))
+    assert reader.learn(two_glyphs(), "18")
+    assert reader.labels == ["1", "8"]
+    assert reader.version == 1
+
+
+def test_save_writes_a_loadable_file(tmp_path):
+    path = str(tmp_path / "glyphs.npz")
+    reader = DigitRecognizer(path=path)
+    reader.learn(two_glyphs(), "18")
+    assert not os.path.exists(path + ".tmp")
+    assert DigitRecognizer(path=path).labels == ["1", "8"]
+
+
+def test_pool_timeout_falls_back_to_this_thread(monkeypatch):
+    monkeypatch.setattr(pipeline, "RESULT_TIMEOUT", 0.01)
+    stuck = Future()  # 工作行程卡住：永遠不會完成
+    assert pipeline.AcquisitionWorker._pool_result(stuck, lambda: (123, 4.5)) == (123, 4.5)
+
+
+def test_pool_error_falls_back_to_this_thread():
+    failed = Future()
+    failed.set_exception(RuntimeError("TesseractError: boom"))
+    assert pipeline.AcquisitionWorker._pool_result(failed, lambda: (123, 4.5)) == (123, 4.5)
+    done = Future()
+    done.set_result((7, 0.1))
+    assert pipeline.AcquisitionWorker._pool_result(done, lambda: (123, 4.5)) == (7, 0.1)
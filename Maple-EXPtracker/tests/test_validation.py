@@ -0,0 +1,106 @@
+# tests/test_validation.py
+# OCR 讀數合理性檢查：正常練功不誤擋、可疑讀數的重讀流程、閒置後爆發的重新定錨、金幣變化上限
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validation import ExpValidator, MesoValidator  # noqa: E402
+
+NEED = 100000  # 升級所需經驗
+
+
+def reading(percent):
+    return round(percent * NEED / 100), round(percent, 2)
+
+
+def no_reread():
+    return None
+
+
+def test_normal_grind_is_never_rejected():
+    v = ExpValidator()
+    percent, now = 10.0, 0.0
+    for _ in range(300):
+        assert v.validate(reading(percent), 0.99, now, no_reread) == reading(percent)
+        percent += 0.13
+        now += 2.0
+    assert v.rejected == 0
+    assert v.rereads == 0
+
+
+def test_burst_after_idle_is_rebased():
+    v = ExpValidator()
+    now = 0.0
+    for _ in range(300):  # 閒置 10 分鐘，速度歸零
+        v.validate(reading(10.0), None, now, no_reread)
+        now += 2.0
+    results = []
+    for percent in (11.5, 11.7, 11.9, 12.1):
+        results.append(v.validate(reading(percent), None, now, no_reread))
+        now += 2.0
+    assert results[:v.confirm_count - 1] == [None] * (v.confirm_count - 1)
+    assert results[v.confirm_count - 1:] == [reading(11.9), reading(12.1)]
+    assert v.rebased == 1
+
+
+def test_isolated_misread_is_still_rejected():
+    v = ExpValidator()
+    v.validate(reading(10.0), None, 0.0, no_reread)
+    assert v.validate(reading(90.0), None, 2.0, no_reread) is None
+    assert v.validate(reading(10.05), None, 4.0, no_reread) == reading(10.05)
+    assert v.validate(reading(95.0), None, 6.0, no_reread) is None
+    assert v.rebased == 0
+
+
+def test_reread_confirms_same_value():
+    v = ExpValidator()
+    v.validate(reading(10.0), None, 0.0, no_reread)
+    jump = reading(15.0)
+    assert v.validate(jump, None, 2.0, lambda: jump) == jump
+    assert v.rereads == 1
+    assert v.corrected == 0
+
+
+def test_reread_corrects_misread():
+    v = ExpValidator()
+    v.validate(reading(10.0), None, 0.0, no_reread)
+    assert v.validate(reading(70.1), None, 2.0, lambda: reading(10.1)) == reading(10.1)
+    assert v.corrected == 1
+
+
+def test_low_confidence_without_reread_is_accepted():
+    v = ExpValidator()
+    v.validate(reading(10.0), None, 0.0, no_reread)
+    assert v.validate(reading(10.1), 0.5, 2.0, no_reread) == reading(10.1)
+    assert v.rereads == 1
+
+
+def test_death_penalty_confirmed_by_reread():
+    v = ExpValidator()
+    v.validate(reading(60.0), None, 0.0, no_reread)
+    death = reading(54.0)
+    assert v.validate(death, None, 2.0, lambda: death) == death
+    assert v.last == death
+
+
+def test_level_up_is_accepted_without_reread():
+    v = ExpValidator()
+    v.validate(reading(99.0), None, 0.0, no_reread)
+
+    def reread():
+        raise AssertionError("升級不需要重讀")
+
+    assert v.validate((1200, 1.0), None, 2.0, reread) == (1200, 1.0)
+
+
+def test_meso_change_limit():
+    v = MesoValidator()
+    assert v.validate(1_000_000, None, 0.0, no_reread) == 1_000_000
+    assert v.validate(1_400_000, None, 1.0, no_reread) == 1_400_000    # 不超過一半
+    assert v.validate(5_000_000, None, 2.0, no_reread) is None         # 變化太大
+    assert v.validate(5_000_000, None, 3.0, lambda: 5_000_000) == 5_000_000  # 重讀確認為真
+    small = MesoValidator()
+    small.validate(1000, None, 0.0, no_reread)
+    assert small.validate(90_000, None, 1.0, no_reread) == 90_000      # 金幣少時以 min_change 為準
@@ -0,0 +1,209 @@
+# validation.py
+# OCR 讀數合理性檢查：讀錯一個數字就會永久扭曲累計經驗、最佳紀錄與升級估算，所以進 tracker 前先過濾
+#
+# - 依最近的趨勢檢查：同一等級內經驗不倒退、經驗與百分比比例一致、變化幅度不超過近期速度太多
+# - 字模辨識的逐字信心也納入：信心偏低的新讀數視同可疑
+# - 只有可疑時才針對那一小塊區域重讀一次（改用 Tesseract，等於第二個獨立意見），不必每次都讀兩遍
+#   重讀結果與原讀數相同 → 確認為真（例如死亡扣經驗、大筆花費）；重讀結果本身合理 → 採用重讀；否則丟棄
+# - 被丟棄的讀數若連續 confirm_count 筆彼此一致，視為新的趨勢（例如閒置後速度歸零又突然開始打怪、
+#   沒有 Tesseract 可以重讀），改以這幾筆重新建立基準，不會一直卡住
+#
+
+import copy
+
+from exp import is_level_up
+from profiling import profiler
+
+
+class ReadingValidator:
+    """通用流程；子類別實作 problems() 與 _remember()"""
+
+    name = "reading"
+
+    def __init__(self, trust_confidence=0.92, confirm_count=3):
+        self.trust_confidence = trust_confidence  # 字模辨識信心低於此值的新讀數要重讀確認
+        self.confirm_count = confirm_count        # 連續幾筆彼此一致的被丟棄讀數可以確立新趨勢
+        self.last = None
+        self.last_time = None
+        self.pending = []                         # 被丟棄但彼此一致的讀數 [(value, now), ...]
+        self.accepted = 0
+        self.rereads = 0
+        self.corrected = 0
+        self.rejected = 0
+        self.rebased = 0
+
+    def reset(self):
+        self.last = None
+        self.last_time = None
+        self.pending = []
+
+    def problems(self, value, now) -> list:
+        """回傳不合理的原因（空清單表示合理）"""
+        return []
+
+    def _remember(self, value, now):
+        self.last = value
+        self.last_time = now
+
+    def _accept(self, value, now):
+        self._remember(value, now)
+        self.pending = []
+        self.accepted += 1
+        return value
+
+    def _agrees_with_pending(self, value, now) -> bool:
+        """以被丟棄的讀數為基準（不看舊趨勢）時，這筆讀數是否合理"""
+        probe = copy.copy(self)
+        probe.reset()
+        for v, t in self.pending:
+            probe._remember(v, t)
+        return not probe.problems(value, now)
+
+    def _hold(self, value, now) -> bool:
+        """記下被丟棄的讀數；連續 confirm_count 筆彼此一致時改以它們為新基準，回傳 True"""
+        if not self._agrees_with_pending(value, now):
+            self.pending = []
+            if not self._agrees_with_pending(value, now):  # 本身就不合理（例如超出範圍）
+                return False
+        self.pending.append((value, now))
+        if len(self.pending) < self.confirm_count:
+            return False
+        pending = self.pending
+        self.reset()
+        for v, t in pending:
+            self._remember(v, t)
+        return True
+
+    def validate(self, value, confidence, now, reread):
+        """
+        檢查一筆讀數，必要時呼叫 reread() 重讀一次。
+        confidence 為字模辨識的最低逐字信心（Tesseract 讀的為 None）。
+        回傳採用的讀數，丟棄時回傳 None
+        """
+        if value is None:
+            return None
+        reasons = self.problems(value, now)
+        low_confidence = confidence is not None and confidence < self.trust_confidence and value != self.last
+        if not reasons and not low_confidence:
+            return self._accept(value, now)
+
+        self.rereads += 1
+        profiler.count(f"{self.name}_reread")
+        try:
+            second = reread()
+        except Exception as e:  # 例如沒有安裝 Tesseract
+            print("重讀失敗:", e)
+            second = None
+
+        if second == value:
+            return self._accept(value, now)  # 兩個獨立讀數一致，是真的變化
+        if second is not None and not self.problems(second, now):
+            self.corrected += 1
+            return self._accept(second, now)
+        if second is None and not reasons:
+            return self._accept(value, now)  # 只是信心偏低、又沒辦法重讀，仍然採用
+        if self._hold(value, now):
+            self.rebased += 1
+            self.accepted += 1
+            profiler.count(f"{self.name}_rebased")
+            print(f"ℹ️ 連續 {self.confirm_count} 筆讀數一致，改以 {value} 為新基準")
+            return value
+        self.rejected += 1
+        profiler.count(f"{self.name}_rejected")
+        print(f"⚠️ 丟棄不合理的讀數 {value}（{', '.join(reasons) or '信心不足'}），重讀為 {second}")
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "rereads": self.rereads,
+            "corrected": self.corrected,
+            "rejected": self.rejected,
+            "rebased": self.rebased,
+        }
+
+
+class ExpValidator(ReadingValidator):
+    """
+    讀數為 (exp, percent)：
+     - 同一等級內經驗與百分比不會倒退（升級與死亡扣經驗的判斷見 exp.is_level_up）
+     - exp / percent 推出的升級所需經驗要與先前一致（百分比顯示到小數兩位，容許對應的誤差）
+     - 百分比增加量不超過 max(min_jump, burst × 近期速度 × 經過時間)
+    """
+
+    name = "exp"
+
+    def __init__(self, trust_confidence=0.92, min_jump=1.0, burst=5.0, confirm_count=3):
+        super().__init__(trust_confidence, confirm_count)
+        self.min_jump = min_jump        # 任何時候都允許的百分比增加量
+        self.burst = burst              # 允許超過近期速度的倍數
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.need = None                # 升級所需經驗的推算值
+        self._need_percent = 0.0        # 推算所依據的百分比，越高越準
+        self.rate = 0.0                 # 近期每秒增加的百分比（指數移動平均）
+
+    def _is_level_up(self, exp, percent) -> bool:
+        last_exp, last_percent = self.last
+        return is_level_up(last_exp, last_percent, exp, percent)
+
+    def problems(self, value, now) -> list:
+        exp, percent = value
+        if exp < 0 or not 0.0 <= percent <= 100.0:
+            return ["超出範圍"]
+        if self.last is None:
+            return []
+        if self._is_level_up(exp, percent):
+            return []
+        last_exp, last_percent = self.last
+
+        reasons = []
+        if exp < last_exp or percent < last_percent - 0.01:
+            reasons.append("經驗倒退")
+        if self.need and percent >= 1.0:
+            expected = exp * 100 / self.need
+            tolerance = 0.02 + percent * 0.01 / self._need_percent
+            if abs(percent - expected) > tolerance:
+                reasons.append("經驗與百分比不一致")
+        dt = max(now - self.last_time, 0.0)
+        if percent - last_percent > max(self.min_jump, self.burst * self.rate * dt):
+            reasons.append("增加太快")
+        return reasons
+
+    def _remember(self, value, now):
+        exp, percent = value
+        if self.last is not None:
+            if self._is_level_up(exp, percent):
+                self.need = None
+                self._need_percent = 0.0
+            else:
+                dt = now - self.last_time
+                gain = percent - self.last[1]
+                if dt > 0 and gain >= 0:
+                    self.rate = self.rate * 0.7 + gain / dt * 0.3
+        if percent > 0 and percent >= self._need_percent:
+            self.need = exp * 100 / percent
+            self._need_percent = percent
+        super()._remember(value, now)
+
+
+class MesoValidator(ReadingValidator):
+    """金幣可增可減（花費），只擋一次變化超過 max(min_change, max_fraction × 目前金幣) 的讀數"""
+
+    name = "meso"
+
+    def __init__(self, trust_confidence=0.92, min_change=100_000, max_fraction=0.5, confirm_count=3):
+        super().__init__(trust_confidence, confirm_count)
+        self.min_change = min_change
+        self.max_fraction = max_fraction
+
+    def problems(self, value, now) -> list:
+        if value < 0:
+            return ["超出範圍"]
+        if self.last is None:
+            return []
+        if abs(value - self.last) > max(self.min_change, self.max_fraction * self.last):
+            return ["變化太大"]
+        return []